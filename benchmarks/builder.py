@@ -0,0 +1,52 @@
+# compares pue.dom/pue.script node construction in "validate" and "construct" mode
+# run from the repo root: python -m benchmarks.builder
+import time
+import tracemalloc
+from pue import dom as h, models as m, script as s
+from pue.encoder import encode
+
+
+def _tree(rows: int) -> m.VNode:
+    # 5 nodes per row, ~10k nodes for 2000 rows
+    return h.ul(
+        *[
+            h.li(
+                h.span(
+                    s.if_(s.gt(s.this.get("selected"), i), then="before"),
+                    class_="text-sm text-gray-500",
+                ),
+                class_="py-2",
+                key=i,
+            )
+            for i in range(rows)
+        ],
+        class_="divide-y divide-gray-200",
+    )
+
+
+def _measure(mode: m.BuilderMode, rows: int):
+    m.set_builder_mode(mode)
+    start = time.perf_counter()
+    _tree(rows)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    tree = _tree(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, encode(tree)
+
+
+def main():
+    rows = 2000
+    print(f"{'mode':<11}{'ms':>9}{'peak KiB':>10}")
+    payloads = []
+    for mode in ("validate", "construct"):
+        elapsed, peak, payload = _measure(mode, rows)
+        payloads.append(payload)
+        print(f"{mode:<11}{elapsed * 1000:>9.1f}{peak / 1024:>10.0f}")
+    m.set_builder_mode("validate")
+    assert payloads[0] == payloads[1], "builder modes produced different payloads"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+// times re-rendering the example Todos component with a large list under the
+// "interpret" and "compile" client modes
+// run from the repo root: node benchmarks/client_render.mjs [items] [renders]
+import { execFileSync } from "node:child_process";
+import "./vue_stub.mjs";
+
+const { payload2Component } = await import("../pue/client.js");
+
+const items = Number(process.argv[2] ?? 10_000);
+const renders = Number(process.argv[3] ?? 20);
+
+function payload(component) {
+  const script = [
+    "import asyncio, example",
+    "from pue.encoder import encode",
+    `print(encode(asyncio.run(example.${component}.async_endpoint(None))).decode())`,
+  ].join("\n");
+  return JSON.parse(execFileSync("python", ["-c", script], { encoding: "utf8" }));
+}
+
+// stand-in for a mounted component instance: data plus computed getters
+function instance(component) {
+  const self = { ...component.data() };
+  self.todos = Array.from({ length: items }, (_, id) => ({
+    id,
+    title: `todo ${id}`,
+    completed: id % 3 === 0,
+  }));
+  for (const [name, fn] of Object.entries(component.computed ?? {})) {
+    Object.defineProperty(self, name, { get: () => fn.call(self) });
+  }
+  return self;
+}
+
+function time(component) {
+  const self = instance(component);
+  const first = component.render.call(self);
+  const start = performance.now();
+  for (let i = 0; i < renders; i++) {
+    component.render.call(self);
+  }
+  return { ms: (performance.now() - start) / renders, tree: first };
+}
+
+const todos = payload("Todos");
+const results = {};
+for (const mode of ["interpret", "compile"]) {
+  results[mode] = time(payload2Component(todos, mode));
+}
+const same =
+  JSON.stringify(results.interpret.tree) === JSON.stringify(results.compile.tree);
+console.log(`todos: ${items} items, ${renders} renders, same output: ${same}`);
+for (const [mode, { ms }] of Object.entries(results)) {
+  console.log(`${mode.padEnd(10)}${ms.toFixed(2).padStart(10)} ms/render`);
+}
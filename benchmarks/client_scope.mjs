@@ -0,0 +1,92 @@
+// times rendering a nested Map (rows x cells) with locals copied into a new
+// Map for every item, as the client did before, vs child scopes linked to
+// their parent
+// run from the repo root:
+// node benchmarks/client_scope.mjs [rows] [cells] [renders]
+import { execFileSync } from "node:child_process";
+import "./vue_stub.mjs";
+
+const { payload2Component } = await import("../pue/client.js");
+
+const rows = Number(process.argv[2] ?? 1000);
+const cells = Number(process.argv[3] ?? 100);
+const renders = Number(process.argv[4] ?? 10);
+
+function template() {
+  const script = [
+    "from pue import dom as h, script as s",
+    "from pue.encoder import encode",
+    "template = h.div(",
+    "    s.inspect(),",
+    "    h.ul(",
+    "        s.map(",
+    '            s.this.get("rows"),',
+    '            "row",',
+    "            h.li(",
+    "                s.map(",
+    '                    s.local.get("row.cells"),',
+    '                    "cell",',
+    '                    h.span(',
+    '                        s.add(s.local.get("row.id"), s.local.get("cell"))',
+    "                    ),",
+    "                )",
+    "            ),",
+    "        )",
+    "    ),",
+    ")",
+    "print(encode(template).decode())",
+  ].join("\n");
+  return JSON.parse(
+    execFileSync("python", ["-c", script], { encoding: "utf8" })
+  );
+}
+
+// the old Scope.child: every item gets its own copy of all the locals
+function copyingChild(name, value) {
+  const locals = new Map(this.locals instanceof Map ? this.locals : []);
+  locals.set(name, value);
+  return new this.constructor(this.component, locals);
+}
+
+function time(component, self) {
+  const start = performance.now();
+  for (let i = 0; i < renders; i++) {
+    component.render.call(self);
+  }
+  return (performance.now() - start) / renders;
+}
+
+const self = {
+  rows: Array.from({ length: rows }, (_, id) => ({
+    id,
+    cells: Array.from({ length: cells }, (_, cell) => cell),
+  })),
+};
+const payload = { template: template(), data: {} };
+console.log(`nested map: ${rows} x ${cells} items, ${renders} renders`);
+for (const mode of ["interpret", "compile"]) {
+  const component = payload2Component(payload, mode);
+  // s.inspect() hands back the render scope, which is how we get at Scope
+  const [scope, list] = component.render.call(self).children;
+  const proto = Object.getPrototypeOf(scope);
+  const linkedChild = proto.child;
+  const output = JSON.stringify(list);
+  const results = {};
+  for (const [name, child] of [
+    ["copied", copyingChild],
+    ["linked", linkedChild],
+  ]) {
+    proto.child = child;
+    const [, rendered] = component.render.call(self).children;
+    const same = JSON.stringify(rendered) === output;
+    results[name] = time(component, self);
+    if (!same) {
+      throw new Error(`${name} scopes rendered something different`);
+    }
+  }
+  proto.child = linkedChild;
+  for (const [name, ms] of Object.entries(results)) {
+    const timing = ms.toFixed(2).padStart(10);
+    console.log(`${mode.padEnd(10)}${name.padEnd(8)}${timing} ms/render`);
+  }
+}
@@ -0,0 +1,58 @@
+// client half of benchmarks/suite.py: reads {rows, renders, templates,
+// payloads} as json on stdin, renders each template over `rows` rows in the
+// "interpret" and "compile" client modes, times turning each payload (plain and
+// compact) into a component and writes the results as json to stdout
+import "./vue_stub.mjs";
+
+const { payload2Component } = await import("../pue/client.js");
+
+let input = "";
+for await (const chunk of process.stdin) {
+  input += chunk;
+}
+const { rows, renders, templates, payloads } = JSON.parse(input);
+
+const self = {
+  rows: Array.from({ length: rows }, (_, id) => ({
+    id,
+    title: `row ${id}`,
+    done: id % 3 === 0,
+  })),
+};
+
+const results = [];
+for (const [name, template] of Object.entries(templates)) {
+  for (const mode of ["interpret", "compile"]) {
+    const component = payload2Component({ template, data: {} }, mode);
+    // first render also sets up compiled closures, don't count it
+    component.render.call(self);
+    const start = performance.now();
+    for (let i = 0; i < renders; i++) {
+      component.render.call(self);
+    }
+    const ms = (performance.now() - start) / renders;
+    results.push({
+      name: `client.${name}(${rows}).${mode}`,
+      value: Math.round(ms * 10_000) / 10_000,
+      unit: "ms",
+    });
+  }
+}
+for (const [name, formats] of Object.entries(payloads)) {
+  for (const [format, body] of Object.entries(formats)) {
+    // "interpret" doesn't compile, so this is json parsing plus expanding
+    const times = Math.max(10, Math.floor(1_000_000 / body.length));
+    payload2Component(JSON.parse(body), "interpret");
+    const start = performance.now();
+    for (let i = 0; i < times; i++) {
+      payload2Component(JSON.parse(body), "interpret");
+    }
+    const ms = (performance.now() - start) / times;
+    results.push({
+      name: `client.parse.${name}.${format}`,
+      value: Math.round(ms * 10_000) / 10_000,
+      unit: "ms",
+    });
+  }
+}
+process.stdout.write(JSON.stringify(results));
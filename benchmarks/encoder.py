@@ -0,0 +1,66 @@
+# compares pue.encoder against the pydantic/fastapi response_model path
+# run from the repo root: python -m benchmarks.encoder
+import asyncio
+import timeit
+import example
+from fastapi.responses import JSONResponse
+from pue import dom as h, models as m, script as s
+from pue.encoder import encode
+
+
+def _table(rows: int) -> m.ComponentEndpointResponse:
+    return m.ComponentEndpointResponse(
+        template=h.div(
+            *[
+                h.div(
+                    h.span(f"row {i}", class_="text-sm font-medium text-gray-900"),
+                    h.span(
+                        s.if_(
+                            s.gt(s.this.get("selected"), i),
+                            then="before",
+                            else_="after",
+                        ),
+                        class_="text-sm text-gray-500",
+                    ),
+                    class_="flex justify-between py-2",
+                    key=i,
+                )
+                for i in range(rows)
+            ],
+            class_="divide-y divide-gray-200",
+        ),
+        data={"selected": 0},
+    )
+
+
+def _response_model(res: m.ComponentEndpointResponse) -> bytes:
+    # what fastapi does with response_model: validate, dump to jsonable python, json.dumps
+    validated = m.ComponentEndpointResponse.model_validate(res)
+    content = validated.model_dump(mode="json", by_alias=True)
+    return JSONResponse(content).body
+
+
+def main():
+    cases = {
+        cls.name(): asyncio.run(cls.async_endpoint(None))  # type: ignore[arg-type]
+        for cls in (example.App, example.Todos, example.FetchExample)
+    }
+    cases["table(5000)"] = _table(5000)
+    print(f"{'case':<14}{'bytes':>9}{'match':>7}{'pydantic ms':>13}{'encoder ms':>12}")
+    for name, res in cases.items():
+        expected = res.model_dump_json(by_alias=True).encode()
+        actual = encode(res)
+        assert _response_model(res) == expected
+        number = 1 if len(expected) > 100_000 else 200
+        slow = min(
+            timeit.repeat(lambda res=res: _response_model(res), number=number, repeat=5)
+        )
+        fast = min(timeit.repeat(lambda res=res: encode(res), number=number, repeat=5))
+        print(
+            f"{name:<14}{len(actual):>9}{str(actual == expected):>7}"
+            f"{slow / number * 1000:>13.3f}{fast / number * 1000:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# per-request overhead of Component.async_endpoint for a component that only
+# implements async_template, awaiting every hook vs only the implemented ones
+# run from the repo root: python -m benchmarks.endpoint
+import asyncio
+import time
+from fastapi import Request
+import pue
+from pue import dom as h, models as m
+
+
+class Hello(pue.Component):
+    optimize = False
+
+    async def async_template(self, req: Request):
+        return h.div(h.h1("hello", class_="text-3xl"), class_="block")
+
+
+async def _all_hooks(cls: type[pue.Component], req: Request):
+    # what async_endpoint did before, every hook awaited whether implemented or not
+    instance = cls()
+    results = await asyncio.gather(
+        instance.async_template(req=req),
+        *[getattr(instance, f"async_{hook}")() for hook in m.HOOKS[1:]],
+    )
+    return m.ComponentEndpointResponse(**dict(zip(m.HOOKS, results)))
+
+
+async def _time(endpoint, req: Request, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await endpoint(Hello, req)
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    n = 20000
+    req = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+    async def implemented(cls, req):
+        return await cls.async_endpoint(req)
+
+    print(f"{'endpoint':<13}{'us/req':>9}")
+    for name, endpoint in (("all hooks", _all_hooks), ("implemented", implemented)):
+        elapsed = asyncio.run(_time(endpoint, req, n))
+        print(f"{name:<13}{elapsed * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
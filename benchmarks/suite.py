@@ -0,0 +1,342 @@
+# the hot paths in one run, with machine readable results to track across
+# changes:
+# - build: pue.dom/pue.script node construction, per builder mode
+# - endpoint: component endpoint latency and throughput through the config api,
+#   driven in-process over ASGI at a few levels of concurrency
+# - payload: serialized size of representative trees (raw and gzipped), and
+#   serialize time, in the plain and compact (pue.compact) formats
+# - client: client.js render time for large Map/Filter templates under node,
+#   with a stubbed Vue.h, and parse time of the payloads above in either
+#   format (skipped when node isn't installed)
+# run from the repo root:
+#   python -m benchmarks.suite [--json results.json] [--baseline old.json]
+# every result is {"name", "value", "unit"}, --json writes them along with
+# the commit/python/node they were measured on, --baseline prints the change
+# against an earlier --json file
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+import example
+from pue import dom as h, models as m, script as s
+from pue.encoder import encode
+
+Result = Dict[str, Any]
+_DIR = os.path.dirname(__file__)
+
+
+def _result(name: str, value: float, unit: str) -> Result:
+    return {"name": name, "value": round(value, 4), "unit": unit}
+
+
+def _best(fn: Callable[[], object], number: int, repeat: int) -> float:
+    # seconds per call, best of repeat
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def _table(rows: int) -> m.VNode:
+    # 8 nodes per row
+    return h.div(
+        *[
+            h.div(
+                h.span(f"row {i}", class_="text-sm font-medium text-gray-900"),
+                h.span(
+                    s.if_(
+                        s.gt(s.this.get("selected"), i),
+                        then="before",
+                        else_="after",
+                    ),
+                    class_="text-sm text-gray-500",
+                ),
+                class_="flex justify-between py-2",
+                key=i,
+            )
+            for i in range(rows)
+        ],
+        class_="divide-y divide-gray-200",
+    )
+
+
+def _handlers(rows: int) -> m.VNode:
+    # script heavy: every row has a click handler with a few statements
+    return h.ul(
+        *[
+            h.li(
+                h.button(
+                    "select",
+                    on_click=[
+                        s.this.set_("selected", i),
+                        s.this.set_("count", s.add(s.this.get("count"), 1)),
+                        s.if_(s.gt(s.this.get("count"), 10), then=s.log("many")),
+                    ],
+                ),
+                key=i,
+            )
+            for i in range(rows)
+        ]
+    )
+
+
+def _map_template() -> m.VNode:
+    return h.ul(
+        s.map(
+            s.this.get("rows"),
+            "row",
+            h.li(
+                h.span(s.local.get("row.title"), class_="text-sm"),
+                h.span(
+                    s.if_(s.local.get("row.done"), then="done", else_="todo"),
+                    class_="text-xs",
+                ),
+                class_="py-2",
+            ),
+        )
+    )
+
+
+def _filter_template() -> m.VNode:
+    return h.ul(
+        s.map(
+            s.filter(s.this.get("rows"), "row", s.local.get("row.done")),
+            "row",
+            h.li(s.local.get("row.title"), class_="py-2"),
+        )
+    )
+
+
+def bench_build(repeat: int) -> List[Result]:
+    results = []
+    cases = {
+        "table(1000)": lambda: _table(1000),
+        "handlers(500)": lambda: _handlers(500),
+    }
+    try:
+        for mode in ("validate", "construct"):
+            m.set_builder_mode(mode)
+            for case, fn in cases.items():
+                elapsed = _best(fn, number=1, repeat=repeat)
+                results.append(_result(f"build.{case}.{mode}", elapsed * 1000, "ms"))
+    finally:
+        m.set_builder_mode("validate")
+    return results
+
+
+async def _get(app, path: str) -> int:
+    # just enough of an ASGI server to send a GET and drain the response
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    status = 0
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    assert status == 200, f"GET {path}: {status}"
+    return size
+
+
+async def _load(app, path: str, requests: int, concurrency: int):
+    # latencies of every request, and the wall time for all of them
+    latencies: List[float] = []
+    pending = iter(range(requests))
+
+    async def worker():
+        for _ in pending:
+            start = time.perf_counter()
+            await _get(app, path)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return sorted(latencies), time.perf_counter() - start
+
+
+def bench_endpoint(requests: int) -> List[Result]:
+    results = []
+    app = example.PUE.config_api
+
+    async def run():
+        for cls in (example.App, example.Todos, example.FetchExample):
+            path = "/" + cls.endpoint_path()
+            # warm up, so the first request's setup isn't measured
+            await _load(app, path, 50, 1)
+            for concurrency in (1, 32):
+                latencies, wall = await _load(app, path, requests, concurrency)
+                prefix = f"endpoint.{cls.name()}.c{concurrency}"
+                p50 = latencies[len(latencies) // 2]
+                p95 = latencies[int(len(latencies) * 0.95)]
+                results.append(_result(f"{prefix}.p50", p50 * 1e6, "us"))
+                results.append(_result(f"{prefix}.p95", p95 * 1e6, "us"))
+                results.append(
+                    _result(f"{prefix}.throughput", requests / wall, "req/s")
+                )
+
+    asyncio.run(run())
+    return results
+
+
+def _responses() -> Dict[str, m.ComponentEndpointResponse]:
+    responses = {
+        cls.name(): asyncio.run(cls.async_endpoint(None))  # type: ignore[arg-type]
+        for cls in (example.App, example.Todos, example.FetchExample)
+    }
+    responses["table(1000)"] = m.ComponentEndpointResponse(
+        template=_table(1000), data={"selected": 0}
+    )
+    return responses
+
+
+def bench_payload(repeat: int) -> List[Result]:
+    results = []
+    for name, res in _responses().items():
+        rendered = m.RenderedComponent.from_response(res)
+        compact = m.RenderedComponent.from_response(res, compact=True)
+        body = rendered.payload.body
+        results.append(_result(f"payload.{name}.bytes", len(body), "B"))
+        results.append(_result(f"payload.{name}.gzip", len(gzip.compress(body)), "B"))
+        results.append(
+            _result(f"payload.{name}.bundle", len(rendered.bundle.body), "B")
+        )
+        results.append(_result(f"payload.{name}.data", len(rendered.data), "B"))
+        # the same payload with the bundle in the compact format
+        body = compact.payload.body
+        results.append(_result(f"payload.{name}.compact", len(body), "B"))
+        results.append(
+            _result(f"payload.{name}.compact_gzip", len(gzip.compress(body)), "B")
+        )
+        for fmt, flag in (("plain", False), ("compact", True)):
+            elapsed = _best(
+                lambda res=res, flag=flag: m.RenderedComponent.from_response(res, flag),
+                number=1 if len(body) > 100_000 else 20,
+                repeat=repeat,
+            )
+            results.append(
+                _result(f"payload.{name}.serialize.{fmt}", elapsed * 1000, "ms")
+            )
+    return results
+
+
+def bench_client(rows: int, renders: int) -> List[Result]:
+    if shutil.which("node") is None:
+        print("node not found, skipping client benchmarks", file=sys.stderr)
+        return []
+    templates = {"map": _map_template(), "filter": _filter_template()}
+    payload = {
+        "rows": rows,
+        "renders": renders,
+        "templates": {name: json.loads(encode(t)) for name, t in templates.items()},
+        # component payloads as sent, to time parsing them in either format
+        "payloads": {
+            name: {
+                fmt: m.RenderedComponent.from_response(
+                    res, fmt == "compact"
+                ).payload.body.decode()
+                for fmt in ("plain", "compact")
+            }
+            for name, res in _responses().items()
+        },
+    }
+    out = subprocess.run(
+        ["node", f"{_DIR}/client_suite.mjs"],
+        input=json.dumps(payload),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def _meta() -> Dict[str, Any]:
+    def output(*cmd: str) -> str | None:
+        try:
+            return subprocess.run(
+                cmd, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": output("git", "rev-parse", "--short", "HEAD"),
+        "python": platform.python_version(),
+        "node": output("node", "--version"),
+        "machine": platform.machine(),
+    }
+
+
+def _print(results: List[Result], baseline: Dict[str, float]):
+    header = f"{'name':<40}{'value':>12}  {'unit':<6}"
+    print(header + (f"{'baseline':>12}{'change':>9}" if baseline else ""))
+    for result in results:
+        line = f"{result['name']:<40}{result['value']:>12.2f}  {result['unit']:<6}"
+        before = baseline.get(result["name"])
+        if before is not None:
+            change = (result["value"] - before) / before * 100 if before else 0
+            line += f"{before:>12.2f}{change:>+8.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", help="write results to this file, - for stdout")
+    parser.add_argument("--baseline", help="compare against an earlier --json file")
+    parser.add_argument("--only", help="comma separated groups to run")
+    parser.add_argument("--quick", action="store_true", help="smaller, noisier runs")
+    args = parser.parse_args()
+
+    scale = 5 if args.quick else 1
+    groups = {
+        "build": lambda: bench_build(repeat=10 // scale),
+        "endpoint": lambda: bench_endpoint(requests=2000 // scale),
+        "payload": lambda: bench_payload(repeat=5 // scale),
+        "client": lambda: bench_client(rows=10_000, renders=20 // scale),
+    }
+    only = args.only.split(",") if args.only else list(groups)
+    results: List[Result] = []
+    for name in only:
+        results.extend(groups[name]())
+
+    baseline: Dict[str, float] = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r["name"]: r["value"] for r in json.load(f)["results"]}
+    if args.json == "-":
+        print(json.dumps({"meta": _meta(), "results": results}, indent=2))
+        return
+    _print(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": _meta(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+// just enough of the Vue global for client.js to run under node
+// h() allocates a plain vnode-ish object so render cost stays comparable
+globalThis.Vue = {
+  h: (type, props, children) => ({ type, props, children }),
+  resolveComponent: (name) => name,
+  isVNode: (value) => value !== null && typeof value === "object" && "type" in value,
+  withModifiers: (fn) => fn,
+  resolveDirective: () => undefined,
+  // same contract as vue's: reuse cache[index] while the deps are unchanged
+  withMemo: (memo, render, cache, index) => {
+    const cached = cache[index];
+    if (
+      cached &&
+      cached.memo.length === memo.length &&
+      cached.memo.every((dep, i) => Object.is(dep, memo[i]))
+    ) {
+      return cached;
+    }
+    const vnode = render();
+    vnode.memo = memo.slice();
+    return (cache[index] = vnode);
+  },
+};
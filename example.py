@@ -5,6 +5,8 @@ from pue.script import this, local
 
 
 class App(pue.Component):
+    # layout never changes between requests, serve it straight from memory
+    render_cache = pue.RenderCache(ttl=60)
     NAV = [
         {"name": "Todos", "to": "/todos"},
         {"name": "Fetch", "to": "/fetch"},
@@ -172,7 +174,11 @@ class FetchExample(pue.Component):
         return s.try_(
             this.set_(
                 "photos",
-                s.fetch("https://picsum.photos/v2/list?limit=16"),
+                s.fetch(
+                    "https://picsum.photos/v2/list?limit=16",
+                    ttl=60,
+                    stale_while_revalidate=600,
+                ),
             ),
             catch=this.set_("error", local.get("error.message")),
             finally_=this.set_("is_loading", False),
@@ -266,16 +272,19 @@ PUE = pue.Pue(
                 pue.Route(
                     name="Todos",
                     path="todos",
+                    prefetch="visible",
                     component=Todos,
                 ),
                 pue.Route(
                     name="Fetch",
                     path="fetch",
+                    prefetch="visible",
                     component=FetchExample,
                 ),
             ],
         )
-    ]
+    ],
+    ssr=True,
 )
 APP = FastAPI()
 APP.mount(PUE.config_path, PUE.config_api)
@@ -1,4 +1,15 @@
+from .cache import RenderCache
+from .dataloader import DataLoader, loader
 from .main import Pue
-from .models import Component, Route
+from .models import Component, Page, Route, action
 
-__all__ = ["Pue", "Component", "Route"]
+__all__ = [
+    "Pue",
+    "Component",
+    "Route",
+    "Page",
+    "RenderCache",
+    "DataLoader",
+    "action",
+    "loader",
+]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Tuple
+
+if TYPE_CHECKING:
+    from .models import RenderedComponent
+
+
+class RenderCache:
+    """
+    in-memory cache of serialized component endpoint responses (and their
+    compressed variants, see pue.payload and pue.models.RenderedComponent)
+    opt-in per component class via `Component.render_cache`, keyed on the
+    component class plus whatever `Component.cache_key` derives from the request.
+    entries are evicted least-recently-used once `maxsize` is reached, and
+    expire after `ttl` seconds if set, as measured by `clock`
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, RenderedComponent]] = (
+            OrderedDict()
+        )
+
+    def get(self, key: Hashable) -> RenderedComponent | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if expires < self.clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: RenderedComponent):
+        expires = self.clock() + self.ttl if self.ttl is not None else float("inf")
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,86 +1,859 @@
-const { h, resolveComponent, isVNode, withModifiers, resolveDirective } = Vue;
+const {
+  h,
+  resolveComponent,
+  isVNode,
+  withModifiers,
+  resolveDirective,
+  withMemo,
+} = Vue;
 /**
  * pue entrypoint
  * fetch config from server, turn into vue-router routes
+ * basePath is where the config api is mounted, each option has its own default
+ * mode picks how templates run: "compile" (default) turns them into closures
+ * once per component load, "interpret" walks the ast on every render
+ * profile reports render/script timings to the server, see Profiler
  */
-export async function pue(
-  opts = {
-    basePath: "/_pue",
+export async function pue({
+  basePath = "/_pue",
+  mode = "compile",
+  profile = false,
+} = {}) {
+  const loader = new ComponentLoader(basePath);
+  actions = new ActionQueue(basePath);
+  prefetcher = new RoutePrefetcher(loader, PREFETCH_CONCURRENCY);
+  if (profile) {
+    profiler = new Profiler(basePath);
   }
-) {
-  const res = await fetch(`${opts.basePath}/routes`);
-  const { routes } = await res.json();
-  return routes.map((route) => config2Route(route, opts));
+  const live = new LiveConnection(basePath, loader);
+  const runtime = { loader, live, mode };
+  let routes;
+  const state = initialState();
+  if (state) {
+    // inlined into the page by the server, no round trips needed for first paint
+    routes = state.routes;
+    loader.seed(state);
+  } else {
+    const res = await fetch(`${basePath}/routes`);
+    ({ routes } = await res.json());
+  }
+  return routes.map((route) => config2Route(route, runtime, []));
+}
+/**
+ * route config + component bundles/data embedded in the index page, if any
+ */
+function initialState() {
+  if (typeof document === "undefined") {
+    return null;
+  }
+  const el = document.getElementById("pue-state");
+  return el ? JSON.parse(el.textContent) : null;
 }
 /**
  * builds a vue router route based on config from the server
+ * chain is the component names of the route's ancestors, outermost first
  */
 function config2Route(
-  { path, name, children, componentEndpoint, redirect },
-  opts
+  { path, name, children, componentName, redirect, prefetch },
+  runtime,
+  chain
 ) {
   let component;
-  if (componentEndpoint) {
-    component = endpoint2LazyComponent(componentEndpoint, opts);
+  let beforeEnter;
+  if (componentName) {
+    chain = [...chain, componentName];
+    component = name2LazyComponent(componentName, chain, runtime);
+    // the component itself is only loaded once, its data on every visit
+    beforeEnter = () => runtime.loader.refresh(componentName);
   }
   return {
     path,
     name,
     component,
     redirect,
-    children: children.map((route) => config2Route(route, opts)),
+    beforeEnter,
+    // read by RouterLinks to this route, see RoutePrefetcher
+    meta: { pue: { chain, prefetch } },
+    children: children.map((route) => config2Route(route, runtime, chain)),
   };
 }
 /**
  * builds a vue component based on config from the server
  * lazy-loaded by vue router when the route is visited
  * https://router.vuejs.org/guide/advanced/lazy-loading.html
+ * the whole matched chain is requested up front, so a nested route
+ * costs one round trip instead of one per level
  */
-function endpoint2LazyComponent(endpoint, { basePath }) {
+function name2LazyComponent(name, chain, { loader, live, mode }) {
   return async () => {
-    const path = `${basePath}/${endpoint}`;
-    const res = await fetch(path);
-    const {
-      template,
-      created,
-      beforeMount,
-      mounted,
-      beforeUpdate,
-      updated,
-      beforeUnmount,
-      unmounted,
-      computed,
-      watch,
-      data,
-    } = await res.json();
+    loader.prefetch(chain);
+    const bundle = await loader.load(name);
+    const component = payload2Component(
+      { ...bundle, data: () => loader.takeData(name) },
+      mode
+    );
+    if (bundle.live) {
+      live.attach(name, component);
+    }
+    return component;
+  };
+}
+/**
+ * builds a vue component from a component endpoint payload
+ * data can also be a function returning the latest data
+ */
+export function payload2Component(payload, mode = "compile") {
+  const {
+    template,
+    created,
+    beforeMount,
+    mounted,
+    beforeUpdate,
+    updated,
+    beforeUnmount,
+    unmounted,
+    computed,
+    watch,
+    data,
+  } = expandBundle(payload);
+  const compiled = mode === "compile";
+  const toFunc = compiled ? script2CompiledFunc : script2Func;
+  // swapped out by live updates, see patchTemplate
+  const view = {
+    template,
+    render: compiled ? compile(template) : null,
+    // vnodes of static subtrees by instance, see hoist
+    hoisted: new WeakMap(),
+  };
+  return {
+    mounted: script2Promise(mounted),
+    created: script2Promise(created),
+    beforeMount: script2Promise(beforeMount),
+    beforeUpdate: script2Promise(beforeUpdate),
+    updated: script2Promise(updated),
+    beforeUnmount: script2Promise(beforeUnmount),
+    unmounted: script2Promise(unmounted),
+    computed: transformValues(computed, toFunc),
+    watch: transformValues(watch, toFunc),
+    data() {
+      return typeof data === "function" ? data() : data;
+    },
+    render() {
+      const ctx = new Scope(this);
+      ctx.hoisted = view.hoisted.get(this);
+      if (!ctx.hoisted) {
+        view.hoisted.set(this, (ctx.hoisted = []));
+      }
+      return compiled ? view.render(ctx) : interpret(view.template, ctx);
+    },
+    // applies template ops from a live update, instances need a $forceUpdate
+    patchTemplate(ops) {
+      if (view.template === template) {
+        // the original may be shared with the bundle cache, and share nodes
+        // between places if it was compact. copy it as a plain tree
+        view.template = JSON.parse(JSON.stringify(template));
+      }
+      applyPatch(view, ops);
+      // static subtrees may have changed or been renumbered
+      view.hoisted = new WeakMap();
+      if (compiled) {
+        view.render = compile(view.template);
+      }
+    },
+  };
+}
+/**
+ * compact bundles (Component.compact) carry a table of strings and nodes used
+ * more than once under "$", and {"$": index} wherever one is used. refs are
+ * replaced in place, so every use of an entry is the same object and nothing
+ * is copied. data is never compact, it's left alone
+ */
+function expandBundle(payload) {
+  const { $: table, ...bundle } = payload;
+  if (!table) {
+    return payload;
+  }
+  const entries = new Array(table.length);
+  const entry = (index) => {
+    const value = table[index];
+    return typeof value === "object"
+      ? (entries[index] ??= expand(value))
+      : value;
+  };
+  // objects only, primitives are never refs and are left where they are
+  const expand = (value) => {
+    if (Array.isArray(value)) {
+      for (let i = 0; i < value.length; i++) {
+        const item = value[i];
+        if (item !== null && typeof item === "object") {
+          value[i] = expand(item);
+        }
+      }
+      return value;
+    }
+    if (value.$ !== undefined) {
+      return entry(value.$);
+    }
+    for (const key in value) {
+      const item = value[key];
+      if (item !== null && typeof item === "object") {
+        value[key] = expand(item);
+      }
+    }
+    return value;
+  };
+  for (const key in bundle) {
+    const value = bundle[key];
+    if (key !== "data" && value !== null && typeof value === "object") {
+      bundle[key] = expand(value);
+    }
+  }
+  return bundle;
+}
+/**
+ * loads component payloads from the batch endpoint
+ * loads requested in the same tick are coalesced into a single request
+ */
+class ComponentLoader {
+  // name -> promise of bundle
+  payloads = new Map();
+  // name -> { resolve, reject } waiting on the next flush
+  pending = new Map();
+  // name -> latest data
+  data = new Map();
+  // components whose data has been handed out, refreshed on the next visit
+  stale = new Set();
+  constructor(basePath) {
+    this.basePath = basePath;
+    this.bundles = new BundleCache();
+  }
+  load(name) {
+    let payload = this.payloads.get(name);
+    if (!payload) {
+      payload = new Promise((resolve, reject) => {
+        if (!this.pending.size) {
+          queueMicrotask(() => this.flush());
+        }
+        this.pending.set(name, { resolve, reject });
+      });
+      // allow a later navigation to retry
+      payload.catch(() => this.payloads.delete(name));
+      this.payloads.set(name, payload);
+    }
+    return payload;
+  }
+  seed({ components, bundles }) {
+    for (const [name, { bundle, data }] of Object.entries(components)) {
+      this.bundles.put(name, bundle, bundles[bundle]);
+      this.data.set(name, data);
+      this.payloads.set(name, Promise.resolve(bundles[bundle]));
+    }
+  }
+  prefetch(names) {
+    // errors surface through load()
+    names.forEach((name) => this.load(name).catch(() => {}));
+  }
+  takeData(name) {
+    this.stale.add(name);
+    return this.data.get(name);
+  }
+  async refresh(name) {
+    if (!this.stale.has(name)) {
+      // not loaded yet, or still fresh from the load
+      return;
+    }
+    try {
+      const res = await fetch(
+        `${this.basePath}/data?names=${encodeURIComponent(name)}`
+      );
+      if (!res.ok) {
+        throw new Error(`failed to load data for ${name}: ${res.status}`);
+      }
+      const { data } = await res.json();
+      this.data.set(name, data[name]);
+      this.stale.delete(name);
+    } catch (e) {
+      // keep showing the last data we have
+      console.warn(e);
+    }
+  }
+  async flush() {
+    const pending = this.pending;
+    this.pending = new Map();
+    const names = [...pending.keys()];
+    try {
+      // bundles we already have for these components don't need sending again
+      const have = await this.bundles.hashes(names);
+      let query = `names=${names.map(encodeURIComponent).join(",")}`;
+      if (have.length) {
+        query += `&have=${have.join(",")}`;
+      }
+      const res = await fetch(`${this.basePath}/components?${query}`);
+      if (!res.ok) {
+        throw new Error(`failed to load components ${names}: ${res.status}`);
+      }
+      const { components, bundles } = await res.json();
+      for (const [name, { resolve }] of pending) {
+        const { bundle, data } = components[name];
+        this.data.set(name, data);
+        resolve(
+          bundles[bundle]
+            ? this.bundles.put(name, bundle, bundles[bundle])
+            : this.fetchBundle(name, bundle)
+        );
+      }
+    } catch (e) {
+      for (const { reject } of pending.values()) {
+        reject(e);
+      }
+    }
+  }
+  async fetchBundle(name, hash) {
+    let bundle = await this.bundles.get(hash);
+    if (!bundle) {
+      // evicted since we said we had it
+      const res = await fetch(`${this.basePath}/bundles/${hash}`);
+      if (!res.ok) {
+        throw new Error(`failed to load bundle ${hash}: ${res.status}`);
+      }
+      bundle = await res.json();
+    }
+    return this.bundles.put(name, hash, bundle);
+  }
+}
+/**
+ * component bundles (template + scripts) by content hash, kept in memory and
+ * in indexeddb so they survive reloads. only the last bundle seen for each
+ * component is kept
+ */
+class BundleCache {
+  // hash -> bundle
+  memory = new Map();
+  // component name -> hash of its last bundle
+  names = new Map();
+  constructor() {
+    this.db = openBundleDB();
+  }
+  async hashes(names) {
+    const db = await this.db;
+    const store = db?.transaction("names").objectStore("names");
+    const hashes = await Promise.all(
+      names.map(
+        (name) => this.names.get(name) ?? (store && idb(store.get(name)))
+      )
+    );
+    return hashes.filter(Boolean);
+  }
+  async get(hash) {
+    let bundle = this.memory.get(hash);
+    if (!bundle) {
+      const db = await this.db;
+      bundle = db
+        ? await idb(db.transaction("bundles").objectStore("bundles").get(hash))
+        : undefined;
+      if (bundle) {
+        this.memory.set(hash, bundle);
+      }
+    }
+    return bundle;
+  }
+  put(name, hash, bundle) {
+    this.memory.set(hash, bundle);
+    this.names.set(name, hash);
+    this.db
+      .then(async (db) => {
+        if (!db) {
+          return;
+        }
+        const tx = db.transaction(["names", "bundles"], "readwrite");
+        const names = tx.objectStore("names");
+        const bundles = tx.objectStore("bundles");
+        const previous = await idb(names.get(name));
+        if (previous === hash) {
+          return;
+        }
+        if (previous) {
+          bundles.delete(previous);
+        }
+        names.put(hash, name);
+        bundles.put(bundle, hash);
+      })
+      .catch((e) => console.warn("failed to cache bundle", e));
+    return bundle;
+  }
+}
+function openBundleDB() {
+  if (typeof indexedDB === "undefined") {
+    return Promise.resolve(null);
+  }
+  const req = indexedDB.open("pue", 1);
+  req.onupgradeneeded = () => {
+    req.result.createObjectStore("names");
+    req.result.createObjectStore("bundles");
+  };
+  // private browsing etc, fall back to memory only
+  return idb(req).catch(() => null);
+}
+function idb(req) {
+  return new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+/**
+ * calls to @pue.action methods on the server
+ * calls made in the same animation frame are sent as one request, and the
+ * server runs them concurrently
+ */
+class ActionQueue {
+  // [{ component, action, args, resolve, reject }]
+  queue = [];
+  constructor(basePath) {
+    this.basePath = basePath;
+  }
+  call(component, action, args) {
+    return new Promise((resolve, reject) => {
+      if (!this.queue.length) {
+        nextFrame(() => this.flush());
+      }
+      this.queue.push({ component, action, args, resolve, reject });
+    });
+  }
+  async flush() {
+    const queue = this.queue;
+    this.queue = [];
+    try {
+      const res = await fetch(`${this.basePath}/actions`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          calls: queue.map(({ component, action, args }) => ({
+            component,
+            action,
+            args,
+          })),
+        }),
+      });
+      if (!res.ok) {
+        throw new Error(`failed to call actions: ${res.status}`);
+      }
+      const { results } = await res.json();
+      queue.forEach(({ component, action, resolve, reject }, i) => {
+        const { value, error } = results[i];
+        if (error === undefined) {
+          resolve(value);
+        } else {
+          reject(new Error(`${component}.${action}: ${error}`));
+        }
+      });
+    } catch (e) {
+      queue.forEach(({ reject }) => reject(e));
+    }
+  }
+}
+/**
+ * loads the components of routes marked prefetch ahead of navigation, from
+ * RouterLinks to them. "hover" routes are loaded when the pointer enters a
+ * link, "visible" ones when a link scrolls into view (and on hover). each
+ * route is only prefetched once, and at most `concurrency` at a time
+ */
+class RoutePrefetcher {
+  // [chain] waiting for a slot
+  queue = [];
+  active = 0;
+  // chains already prefetched or queued, joined
+  seen = new Set();
+  constructor(loader, concurrency) {
+    this.loader = loader;
+    this.concurrency = concurrency;
+    this.observer =
+      typeof IntersectionObserver === "undefined"
+        ? null
+        : new IntersectionObserver((entries) => this.intersect(entries));
+    // observed element -> [router, to]
+    this.targets = new WeakMap();
+  }
+  // props added to every RouterLink
+  linkProps(props, router) {
+    if (!router) {
+      return props;
+    }
+    const { onMouseenter, onVnodeMounted, onVnodeBeforeUnmount } = props;
     return {
-      mounted: script2Promise(mounted),
-      created: script2Promise(created),
-      beforeMount: script2Promise(beforeMount),
-      beforeUpdate: script2Promise(beforeUpdate),
-      updated: script2Promise(updated),
-      beforeUnmount: script2Promise(beforeUnmount),
-      unmounted: script2Promise(unmounted),
-      computed: transformValues(computed, script2Func),
-      watch: transformValues(watch, script2Func),
-      data() {
-        return data;
+      ...props,
+      onMouseenter: (evt) => {
+        this.prefetch(router, props.to);
+        return onMouseenter?.(evt);
       },
-      render() {
-        return interpret(template, new Scope(this));
+      onVnodeMounted: (vnode) => {
+        const target = this.target(router, props.to);
+        if (this.observer && target?.mode === "visible") {
+          this.targets.set(vnode.el, [router, props.to]);
+          this.observer.observe(vnode.el);
+        }
+        return onVnodeMounted?.(vnode);
+      },
+      onVnodeBeforeUnmount: (vnode) => {
+        this.observer?.unobserve(vnode.el);
+        return onVnodeBeforeUnmount?.(vnode);
       },
     };
-  };
+  }
+  intersect(entries) {
+    for (const { isIntersecting, target } of entries) {
+      if (isIntersecting) {
+        this.observer.unobserve(target);
+        this.prefetch(...this.targets.get(target));
+      }
+    }
+  }
+  target(router, to) {
+    try {
+      const record = router.resolve(to).matched.at(-1);
+      const { chain, prefetch } = record?.meta.pue ?? {};
+      return chain?.length && prefetch ? { chain, mode: prefetch } : null;
+    } catch {
+      // not a route we know
+      return null;
+    }
+  }
+  prefetch(router, to) {
+    const chain = this.target(router, to)?.chain;
+    const key = chain?.join(",");
+    if (!chain || this.seen.has(key)) {
+      return;
+    }
+    this.seen.add(key);
+    this.queue.push(chain);
+    this.next();
+  }
+  next() {
+    while (this.active < this.concurrency && this.queue.length) {
+      const chain = this.queue.shift();
+      this.active++;
+      Promise.allSettled(chain.map((name) => this.loader.load(name))).then(
+        () => {
+          this.active--;
+          this.next();
+        }
+      );
+    }
+  }
 }
+const PREFETCH_CONCURRENCY = 2;
+// set up by pue()
+let prefetcher;
+/**
+ * responses to Fetch nodes, in memory. concurrent identical GETs (or
+ * requests with the same dedupeKey) share one request, and with a ttl the
+ * response is reused until it expires, then for staleWhileRevalidate more
+ * seconds it's still used while a fresh one is fetched in the background.
+ * callers each get their own copy, since components mutate their data
+ */
+class FetchCache {
+  // key -> { value, expires, stale, pending }, least recently used first
+  entries = new Map();
+  constructor(size) {
+    this.size = size;
+  }
+  async fetch(ast) {
+    const { method, url, headers, dedupeKey } = ast;
+    if (dedupeKey == null && method !== "get") {
+      return await request(ast);
+    }
+    const key = dedupeKey ?? JSON.stringify([method, url, headers ?? null]);
+    const entry = this.entries.get(key);
+    if (entry) {
+      this.entries.delete(key);
+      this.entries.set(key, entry);
+    }
+    const now = Date.now();
+    if (entry && "value" in entry && now < entry.stale) {
+      if (now >= entry.expires) {
+        this.refresh(key, ast).catch((e) => console.warn(e));
+      }
+      return structuredClone(entry.value);
+    }
+    return structuredClone(await this.refresh(key, ast));
+  }
+  refresh(key, { ttl, staleWhileRevalidate, ...ast }) {
+    let entry = this.entries.get(key);
+    if (!entry) {
+      entry = { pending: null };
+      this.entries.set(key, entry);
+      if (this.entries.size > this.size) {
+        this.entries.delete(this.entries.keys().next().value);
+      }
+    }
+    entry.pending ??= request(ast)
+      .then((value) => {
+        if (ttl) {
+          entry.value = value;
+          entry.expires = Date.now() + ttl * 1000;
+          entry.stale = entry.expires + (staleWhileRevalidate ?? 0) * 1000;
+        }
+        return value;
+      })
+      .finally(() => {
+        entry.pending = null;
+        if (!("value" in entry) && this.entries.get(key) === entry) {
+          // nothing to cache, only shared while in flight
+          this.entries.delete(key);
+        }
+      });
+    return entry.pending;
+  }
+}
+async function request({ url, method, headers }) {
+  const res = await fetch(url, { method, headers: headers ?? undefined });
+  if (!res.ok) {
+    // never cached, and goes down the Fetch error path like a network error
+    throw new Error(`failed to fetch ${url}: ${res.status}`);
+  }
+  return await res.json();
+}
+const FETCH_CACHE_SIZE = 100;
+const fetchCache = new FetchCache(FETCH_CACHE_SIZE);
+// set up by pue()
+let actions;
+function nextFrame(callback) {
+  if (typeof requestAnimationFrame === "undefined") {
+    setTimeout(callback);
+  } else {
+    requestAnimationFrame(callback);
+  }
+}
+/**
+ * live updates for components marked live on the server, see pue/live.py
+ * one websocket per app, opened when the first live component mounts and
+ * reopened if it drops while any are still mounted
+ */
+class LiveConnection {
+  // name -> { component, bundle, instances }
+  subscriptions = new Map();
+  socket = null;
+  constructor(basePath, loader) {
+    this.basePath = basePath;
+    this.loader = loader;
+  }
+  attach(name, component) {
+    const live = this;
+    const { mounted, unmounted } = component;
+    component.mounted = function () {
+      live.mount(name, component, this);
+      return mounted?.call(this);
+    };
+    component.unmounted = function () {
+      live.unmount(name, this);
+      return unmounted?.call(this);
+    };
+  }
+  mount(name, component, instance) {
+    let sub = this.subscriptions.get(name);
+    if (!sub) {
+      // the server only sends the template if it differs from this bundle
+      const bundle = this.loader.bundles.names.get(name);
+      sub = { component, bundle, instances: new Set() };
+      this.subscriptions.set(name, sub);
+      this.send({ subscribe: name, bundle });
+    }
+    sub.instances.add(instance);
+  }
+  unmount(name, instance) {
+    const sub = this.subscriptions.get(name);
+    sub?.instances.delete(instance);
+    if (sub && !sub.instances.size) {
+      this.subscriptions.delete(name);
+      this.send({ unsubscribe: name });
+    }
+  }
+  send(message) {
+    const socket = this.connect();
+    // still connecting, subscriptions are sent once it opens
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify(message));
+    }
+  }
+  connect() {
+    if (this.socket) {
+      return this.socket;
+    }
+    const url = new URL(`${this.basePath}/live`, location.href);
+    url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+    const socket = new WebSocket(url);
+    socket.onopen = () => {
+      for (const [name, { bundle }] of this.subscriptions) {
+        socket.send(JSON.stringify({ subscribe: name, bundle }));
+      }
+    };
+    socket.onmessage = (e) => this.receive(JSON.parse(e.data));
+    socket.onclose = () => {
+      this.socket = null;
+      if (this.subscriptions.size) {
+        setTimeout(() => this.connect(), LIVE_RECONNECT_MS);
+      }
+    };
+    this.socket = socket;
+    return socket;
+  }
+  receive({ component: name, patch }) {
+    const sub = this.subscriptions.get(name);
+    if (!sub) {
+      return;
+    }
+    const template = patch.filter(({ path }) => path[0] === "template");
+    if (template.length) {
+      sub.component.patchTemplate(template);
+      // no longer matches any bundle the server has a hash for
+      sub.bundle = undefined;
+    }
+    // instances usually share one data object, only patch each once
+    const states = new Set([...sub.instances].map((i) => i.$data));
+    for (const state of states) {
+      for (const op of patch) {
+        if (op.path[0] !== "data") {
+          continue;
+        }
+        if (op.path.length === 1) {
+          Object.assign(state, op.value);
+        } else {
+          applyPatch(state, [{ ...op, path: op.path.slice(1) }]);
+        }
+      }
+    }
+    if (template.length) {
+      sub.instances.forEach((instance) => instance.$forceUpdate());
+    }
+  }
+}
+const LIVE_RECONNECT_MS = 1000;
+/**
+ * times every node the server tagged with the source line that built it
+ * (Pue(profile=True)), and every few seconds reports evaluation counts and
+ * times summed by kind and line to the server, see /_pue/profile.
+ * self time leaves out nested nodes, except in async scripts where other
+ * scripts run while one is waiting
+ */
+class Profiler {
+  // "kind loc" -> { kind, loc, count, totalMs, selfMs }
+  nodes = new Map();
+  // time spent in nodes nested in the one being timed
+  nested = 0;
+  constructor(basePath) {
+    this.basePath = basePath;
+    setInterval(() => this.flush(), PROFILE_FLUSH_MS);
+    globalThis.addEventListener?.("pagehide", () => this.flush());
+  }
+  wrap(ast, func) {
+    return (ctx) => this.time(ast, () => func(ctx));
+  }
+  time(ast, func) {
+    const outer = this.nested;
+    this.nested = 0;
+    const start = performance.now();
+    try {
+      return func();
+    } finally {
+      const total = performance.now() - start;
+      this.record(ast, total, total - this.nested);
+      this.nested = outer + total;
+    }
+  }
+  async timeAsync(ast, func) {
+    const start = performance.now();
+    try {
+      return await func();
+    } finally {
+      const total = performance.now() - start;
+      this.record(ast, total, total);
+    }
+  }
+  record({ kind, loc }, totalMs, selfMs) {
+    const key = `${kind} ${loc}`;
+    let node = this.nodes.get(key);
+    if (!node) {
+      node = { kind, loc, count: 0, totalMs: 0, selfMs: 0 };
+      this.nodes.set(key, node);
+    }
+    node.count++;
+    node.totalMs += totalMs;
+    node.selfMs += selfMs;
+  }
+  flush() {
+    if (!this.nodes.size) {
+      return;
+    }
+    const nodes = [...this.nodes.values()];
+    this.nodes = new Map();
+    fetch(`${this.basePath}/profile`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ nodes }),
+      // survives the page going away
+      keepalive: true,
+    }).catch((e) => console.warn("failed to report profile", e));
+  }
+}
+const PROFILE_FLUSH_MS = 5000;
+// set up by pue({ profile: true })
+let profiler = null;
 /**
  * scripting
  */
 // runtime state
 class Scope {
-  locals = new Map();
   currentVNode = null;
-  constructor(component) {
+  // the instance's static subtree vnodes while rendering, see hoist. child
+  // scopes (Map items etc) never have it, so they always build fresh vnodes
+  hoisted = null;
+  constructor(component, locals = new Locals()) {
     this.component = component;
+    this.locals = locals;
+  }
+  // scope for a Map/Filter item, event handler call etc, O(1) however many
+  // locals are already in scope
+  child(name, value) {
+    return new Scope(this.component, new Locals(this.locals, name, value));
+  }
+}
+/**
+ * local variables as a chain of frames, each binding one name and linked to
+ * the frame it was created from. lookups walk up the chain, set() rebinds in
+ * the current frame so children never change what their parent sees
+ */
+class Locals {
+  vars = null;
+  constructor(parent = null, name, value) {
+    this.parent = parent;
+    this.name = name;
+    this.value = value;
+  }
+  get(name) {
+    for (let frame = this; frame; frame = frame.parent) {
+      if (frame.vars?.has(name)) {
+        return frame.vars.get(name);
+      }
+      if (frame.name === name) {
+        return frame.value;
+      }
+    }
+    return undefined;
+  }
+  has(name) {
+    for (let frame = this; frame; frame = frame.parent) {
+      if (frame.vars?.has(name) || frame.name === name) {
+        return true;
+      }
+    }
+    return false;
+  }
+  set(name, value) {
+    if (name === this.name) {
+      this.value = value;
+    } else {
+      (this.vars ??= new Map()).set(name, value);
+    }
+    return this;
   }
 }
 // helper - take a script config and turn it into an async function for the component
@@ -103,6 +876,16 @@ function script2Func(script, ctx) {
     return interpret(script, ctx);
   };
 }
+// helper - same as script2Func, but compiled once up front
+function script2CompiledFunc(script) {
+  if (!script) {
+    return;
+  }
+  const func = compile(script);
+  return function () {
+    return func(new Scope(this));
+  };
+}
 
 /**
  * a little clunky - 2 separate interpreters
@@ -112,6 +895,11 @@ function script2Func(script, ctx) {
  */
 // sync runtime
 function interpret(ast, ctx) {
+  return profiler && ast?.loc
+    ? profiler.time(ast, () => interpretNode(ast, ctx))
+    : interpretNode(ast, ctx);
+}
+function interpretNode(ast, ctx) {
   switch (typeof ast) {
     case "string":
     case "boolean":
@@ -152,6 +940,10 @@ function interpret(ast, ctx) {
           return interpretMap(ast, ctx);
         case "Filter":
           return interpretFilter(ast, ctx);
+        case "For":
+          return interpretFor(ast, ctx);
+        case "VirtualList":
+          return interpretVirtualList(ast, ctx);
         case "Append":
           return interpretAppend(ast, ctx);
         case "Try":
@@ -172,7 +964,12 @@ function interpret(ast, ctx) {
   }
 }
 // async runtime
-async function interpretAsync(ast, ctx) {
+function interpretAsync(ast, ctx) {
+  return profiler && ast?.loc
+    ? profiler.timeAsync(ast, () => interpretAsyncNode(ast, ctx))
+    : interpretAsyncNode(ast, ctx);
+}
+async function interpretAsyncNode(ast, ctx) {
   switch (typeof ast) {
     case "string":
     case "boolean":
@@ -212,6 +1009,8 @@ async function interpretAsync(ast, ctx) {
           return await interpretMapAsync(ast, ctx);
         case "Filter":
           return await interpretFilterAsync(ast, ctx);
+        case "For":
+          return await interpretForAsync(ast, ctx);
         case "Append":
           return await interpretAppendAsync(ast, ctx);
         case "Try":
@@ -229,20 +1028,286 @@ async function interpretAsync(ast, ctx) {
         case "Breakpoint":
           debugger;
         case "Fetch":
-          return await (
-            await fetch(ast.url, {
-              method: ast.method,
-            })
-          ).json();
+          return await fetchCache.fetch(ast);
+        case "Action":
+          return await actions.call(
+            ast.component,
+            ast.name,
+            await transformValuesAsync(ast.args, (val) =>
+              interpretAsync(val, ctx)
+            )
+          );
       }
     default:
       throw new Error(`unexpected node: ${ast.kind}`);
   }
 }
+/**
+ * compiler
+ * turns a sync script/template ast into a tree of closures once per component load,
+ * so re-renders skip the kind dispatch, load path splitting and prop key parsing.
+ * same semantics as interpret(), lifecycle hooks and event handlers stay on the
+ * async interpreter
+ */
+function compile(ast) {
+  const func = compileNode(ast);
+  return profiler && ast?.loc ? profiler.wrap(ast, func) : func;
+}
+function compileNode(ast) {
+  switch (typeof ast) {
+    case "string":
+    case "boolean":
+    case "number":
+    case "bigint":
+    case "undefined":
+      return () => ast;
+    case "object": {
+      if (ast === null) {
+        return () => ast;
+      }
+      if (Array.isArray(ast)) {
+        const items = ast.map(compile);
+        return (ctx) => items.map((item) => item(ctx));
+      }
+      if (ast.isAsync) {
+        return () => {
+          throw new Error(`async not supported in render function (${ast.kind})`);
+        };
+      }
+      switch (ast.kind) {
+        case "VNode":
+          return compileVNode(ast);
+        case "Load":
+          return compileLoad(ast);
+        case "Store": {
+          const value = compile(ast.value);
+          return (ctx) => doStore(ast.scope, ast.name, value(ctx), ctx);
+        }
+        case "BinOp": {
+          const { op } = ast;
+          const left = compile(ast.left);
+          const right = compile(ast.right);
+          return (ctx) => doBinOp(left(ctx), right(ctx), op);
+        }
+        case "If": {
+          const condition = compile(ast.condition);
+          const thenClause = compile(ast.thenClause);
+          const elseClause = compile(ast.elseClause);
+          return (ctx) => (condition(ctx) ? thenClause(ctx) : elseClause(ctx));
+        }
+        case "Panic":
+          return () => interpretPanic(ast);
+        case "BoolOp": {
+          const { op } = ast;
+          const left = compile(ast.left);
+          const right = compile(ast.right);
+          return (ctx) => doBoolOp(left(ctx), right(ctx), op);
+        }
+        case "UnaryOp": {
+          const { op } = ast;
+          const expr = compile(ast.expr);
+          return (ctx) => doUnaryOp(expr(ctx), op);
+        }
+        case "Log": {
+          const value = compile(ast.value);
+          return (ctx) => {
+            console.log(value(ctx));
+          };
+        }
+        case "Map": {
+          const { value } = ast;
+          const iterable = compile(ast.iterable);
+          const body = compile(ast.body);
+          return (ctx) =>
+            iterable(ctx).map((item) => body(ctx.child(value, item)));
+        }
+        case "Filter": {
+          const { value } = ast;
+          const iterable = compile(ast.iterable);
+          const body = compile(ast.body);
+          return (ctx) =>
+            iterable(ctx).filter((item) => body(ctx.child(value, item)));
+        }
+        case "For": {
+          const { value } = ast;
+          const iterable = compile(ast.iterable);
+          const body = compile(ast.body);
+          return (ctx) => {
+            for (const item of iterable(ctx)) {
+              body(ctx.child(value, item));
+            }
+          };
+        }
+        case "VirtualList":
+          return compileVirtualList(ast);
+        case "Append": {
+          const iterable = compile(ast.iterable);
+          const value = compile(ast.value);
+          return (ctx) => {
+            const items = iterable(ctx);
+            items.push(value(ctx));
+          };
+        }
+        case "Try": {
+          const tryClause = compile(ast.tryClause);
+          const catchClause = compile(ast.catchClause);
+          const finallyClause = compile(ast.finallyClause);
+          return (ctx) => {
+            try {
+              return tryClause(ctx);
+            } catch (e) {
+              ctx.locals.set("error", e);
+              return catchClause(ctx);
+            } finally {
+              return finallyClause(ctx);
+            }
+          };
+        }
+        case "Compare": {
+          const { op } = ast;
+          const left = compile(ast.left);
+          const right = compile(ast.right);
+          return (ctx) => doCompare(left(ctx), right(ctx), op);
+        }
+        case "Dictionary": {
+          const entries = Object.entries(ast.value).map(([key, val]) => [
+            key,
+            compile(val),
+          ]);
+          return (ctx) => {
+            const obj = {};
+            for (const [key, val] of entries) {
+              obj[key] = val(ctx);
+            }
+            return obj;
+          };
+        }
+        case "Breakpoint":
+          return (ctx) => {
+            debugger;
+            return ctx;
+          };
+        case "Inspect":
+          return (ctx) => ctx;
+        default:
+          throw new Error(`unexpected node kind: ${ast.kind}`);
+      }
+    }
+    default:
+      throw new Error(`unexpected node type: ${typeof ast}`);
+  }
+}
+function compileVNode(ast) {
+  const { vNodeTypeType: typeType, vNodeTypeVal: type } = ast;
+  const props = compileProps(ast.props);
+  const children = ast.children.map(compile);
+  const renderChildren = (ctx) => children.map((child) => child(ctx));
+  if (typeType === "component") {
+    const componentProps =
+      type === "RouterLink"
+        ? (ctx) => routerLinkProps(props(ctx, ast), ctx)
+        : (ctx) => props(ctx, ast);
+    if (children.length === 0) {
+      //  if no children, prevent from children being interpreted as a slot https://vuejs.org/api/render-function#h
+      return (ctx) => h(resolveComponent(type), componentProps(ctx));
+    }
+    return (ctx) =>
+      h(resolveComponent(type), componentProps(ctx), () => renderChildren(ctx));
+  } else if (typeType === "string") {
+    const render = (ctx) => h(type, props(ctx, ast), renderChildren(ctx));
+    if (ast.static == null) {
+      return render;
+    }
+    return (ctx) => hoist(ast, ctx, () => render(ctx));
+  }
+  throw new Error(`unexpected v node type: ${typeType}`);
+}
+function compileVirtualList(ast) {
+  const { value } = ast;
+  const iterable = compile(ast.iterable);
+  const body = compile(ast.body);
+  const args = transformValues(ast.page?.args, compile);
+  return (ctx) =>
+    h(
+      VirtualListView,
+      virtualListProps(
+        ast,
+        iterable(ctx),
+        (item) => body(ctx.child(value, item)),
+        transformValues(args, (arg) => arg(ctx))
+      )
+    );
+}
+function routerLinkProps(props, ctx) {
+  return prefetcher
+    ? prefetcher.linkProps(props, ctx.component.$router)
+    : props;
+}
+function compileLoad({ scope, name }) {
+  const [key, ...rest] = Array.isArray(name) ? name : name.split(".");
+  if (scope === "local") {
+    return (ctx) => queryPath(ctx.locals.get(key), rest);
+  } else if (scope === "component") {
+    return (ctx) => queryPath(ctx.component[key], rest);
+  }
+  throw new Error(`unexpected scope for get: ${scope}`);
+}
+// see interpretProps
+function compileProps(props) {
+  if (!props) {
+    return () => props;
+  }
+  const compiled = Object.entries(props).map(([rawKey, rawVal]) => {
+    const keyParts = rawKey.split(",");
+    if (!keyParts.length) {
+      throw new Error(`invalid key: ${rawKey}`);
+    }
+    const [key, ...modifiers] = keyParts;
+    if (key.match(/^on[A-Z]/)) {
+      // handlers are created per render to capture the current locals
+      return [
+        key,
+        (ctx) => {
+          const handler = async (evt) =>
+            await interpretAsync(rawVal, ctx.child("$event", evt));
+          return modifiers.length ? withModifiers(handler, modifiers) : handler;
+        },
+      ];
+    }
+    return [key, compile(rawVal)];
+  });
+  return (ctx, ast) => {
+    ctx.currentVNode = ast;
+    const acc = {};
+    for (const [key, val] of compiled) {
+      acc[key] = val(ctx);
+    }
+    ctx.currentVNode = null;
+    return acc;
+  };
+}
+/**
+ * fully static subtrees (VNode.static, numbered by the server) are built once
+ * per instance. every render after that returns the same vnode, which vue
+ * recognizes as memoized and skips without diffing it or anything under it
+ */
+function hoist(ast, ctx, build) {
+  if (ast.static == null || !ctx.hoisted) {
+    return build();
+  }
+  return withMemo(NO_DEPS, build, ctx.hoisted, ast.static);
+}
+const NO_DEPS = [];
 /**
  * visitors
  */
 function interpretVNode(ast, ctx) {
+  if (ast.static != null) {
+    return hoist(ast, ctx, () => interpretElement(ast, ctx));
+  }
+  return interpretElement(ast, ctx);
+}
+function interpretElement(ast, ctx) {
   const {
     vNodeTypeType: typeType,
     vNodeTypeVal: type,
@@ -250,9 +1315,12 @@ function interpretVNode(ast, ctx) {
     props: rawProps,
   } = ast;
   ctx.currentVNode = ast;
-  const props = interpretProps(rawProps, ctx);
+  let props = interpretProps(rawProps, ctx);
   ctx.currentVNode = null;
   if (typeType === "component") {
+    if (type === "RouterLink") {
+      props = routerLinkProps(props, ctx);
+    }
     const component = resolveComponent(type);
     if (children.length === 0) {
       //  if no children, prevent from children being interpreted as a slot https://vuejs.org/api/render-function#h
@@ -292,15 +1360,12 @@ async function interpretLoadAsync(ast, ctx) {
   return interpretLoad(ast, ctx);
 }
 function interpretLoad({ scope, name }, ctx) {
+  // name is either dotted or pre-split into a path by the server
+  const [key, ...rest] = Array.isArray(name) ? name : name.split(".");
   if (scope === "local") {
-    const [key, ...rest] = name.split(".");
-    const obj = ctx.locals.get(key);
-    if (rest.length === 0) {
-      return obj;
-    }
-    return queryObject(obj, rest.join("."));
+    return queryPath(ctx.locals.get(key), rest);
   } else if (scope === "component") {
-    return queryObject(ctx.component, name);
+    return queryPath(ctx.component[key], rest);
   }
   throw new Error(`unexpected scope for get: ${scope}`);
 }
@@ -315,7 +1380,7 @@ function interpretStore({ scope, name, value }, ctx) {
 function doStore(scope, name, value, ctx) {
   if (scope === "local") {
     let obj = ctx.locals;
-    const parts = name.split(".");
+    const parts = Array.isArray(name) ? [...name] : name.split(".");
     const key = parts.pop();
     for (const part of parts) {
       if (!obj.has(part)) {
@@ -324,7 +1389,7 @@ function doStore(scope, name, value, ctx) {
       }
       obj = obj.get(part);
     }
-    if (obj instanceof Map) {
+    if (obj instanceof Map || obj instanceof Locals) {
       obj.set(key, value);
     } else {
       obj[key] = value;
@@ -416,40 +1481,207 @@ function interpretLog({ value }, ctx) {
 }
 function interpretFilter({ value, iterable, body }, ctx) {
   const items = interpret(iterable, ctx);
-  return items.filter((item) => {
-    const newCtx = new Scope(ctx.component);
-    newCtx.locals = new Map(ctx.locals);
-    newCtx.locals.set(value, item);
-    return interpret(body, newCtx);
-  });
+  return items.filter((item) => interpret(body, ctx.child(value, item)));
 }
-function interpretFilterAsync({ value, iterable, body }, ctx) {
-  const items = interpret(iterable, ctx);
-  return items.filter(async (item) => {
-    const newCtx = new Scope(ctx.component);
-    newCtx.locals = new Map(ctx.locals);
-    newCtx.locals.set(value, item);
-    return await interpretAsync(body, newCtx);
-  });
+async function interpretFilterAsync(
+  { value, iterable, body, concurrency },
+  ctx
+) {
+  const items = await interpretAsync(iterable, ctx);
+  const keep = await mapConcurrent(items, concurrency, (item) =>
+    interpretAsync(body, ctx.child(value, item))
+  );
+  return items.filter((_, i) => keep[i]);
 }
 function interpretMap({ value, iterable, body }, ctx) {
   const items = interpret(iterable, ctx);
-  return items.map((item) => {
-    const newCtx = new Scope(ctx.component);
-    newCtx.locals = new Map(ctx.locals);
-    newCtx.locals.set(value, item);
-    return interpret(body, newCtx);
-  });
+  return items.map((item) => interpret(body, ctx.child(value, item)));
 }
-async function interpretMapAsync({ value, iterable, body }, ctx) {
+async function interpretMapAsync({ value, iterable, body, concurrency }, ctx) {
   const items = await interpretAsync(iterable, ctx);
-  return items.map(async (item) => {
-    const newCtx = new Scope(ctx.component);
-    newCtx.locals = new Map(ctx.locals);
-    newCtx.locals.set(value, item);
-    return await interpretAsync(body, newCtx);
-  });
+  return await mapConcurrent(items, concurrency, (item) =>
+    interpretAsync(body, ctx.child(value, item))
+  );
+}
+function interpretFor({ value, iterable, body }, ctx) {
+  for (const item of interpret(iterable, ctx)) {
+    interpret(body, ctx.child(value, item));
+  }
+}
+async function interpretForAsync({ value, iterable, body, concurrency }, ctx) {
+  const items = await interpretAsync(iterable, ctx);
+  await mapConcurrent(items, concurrency, (item) =>
+    interpretAsync(body, ctx.child(value, item))
+  );
+}
+/**
+ * calls fn on every item with at most limit calls pending at once (all at
+ * once without a limit), resolving to the results in item order. stops
+ * starting new calls once one fails
+ */
+async function mapConcurrent(items, limit, fn) {
+  const results = new Array(items.length);
+  let next = 0;
+  let failed = false;
+  const worker = async () => {
+    while (!failed && next < items.length) {
+      const i = next++;
+      try {
+        results[i] = await fn(items[i], i);
+      } catch (e) {
+        failed = true;
+        throw e;
+      }
+    }
+  };
+  const workers = Math.min(Math.max(limit ?? items.length, 1), items.length);
+  await Promise.all(Array.from({ length: workers }, worker));
+  return results;
+}
+function interpretVirtualList(ast, ctx) {
+  const { value, iterable, body, page } = ast;
+  return h(
+    VirtualListView,
+    virtualListProps(
+      ast,
+      interpret(iterable, ctx),
+      (item) => interpret(body, ctx.child(value, item)),
+      transformValues(page?.args, (arg) => interpret(arg, ctx))
+    )
+  );
 }
+function virtualListProps(
+  { rowHeight, height, overscan, page, pageSize },
+  source,
+  renderRow,
+  args
+) {
+  return {
+    source,
+    rowHeight,
+    height,
+    overscan,
+    pageSize,
+    renderRow,
+    loadPage:
+      page &&
+      ((offset, limit) =>
+        actions.call(page.component, page.name, { ...args, offset, limit })),
+  };
+}
+/**
+ * renders the rows of a VirtualList that are in view, plus overscan rows
+ * either side, inside a fixed height scrolling viewport. rows are laid out at
+ * rowHeight, or the height of the first row rendered if not given. if the
+ * source is a page ({ items, total }) the next page is loaded from the server
+ * once the end of the loaded items comes into view
+ */
+const VirtualListView = {
+  props: [
+    "source",
+    "rowHeight",
+    "height",
+    "overscan",
+    "pageSize",
+    "renderRow",
+    "loadPage",
+  ],
+  data() {
+    return { scrollTop: 0, measured: null };
+  },
+  created() {
+    // not reactive, so a failed load doesn't re-render and retry in a loop
+    this.loading = false;
+  },
+  mounted() {
+    this.settle();
+  },
+  updated() {
+    this.settle();
+  },
+  methods: {
+    visible() {
+      const { source, height, overscan } = this;
+      const items = Array.isArray(source) ? source : source?.items ?? [];
+      const total = Array.isArray(source) ? items.length : source?.total ?? 0;
+      const rowHeight =
+        this.rowHeight ?? this.measured ?? VIRTUAL_LIST_ROW_HEIGHT;
+      const first = Math.floor(this.scrollTop / rowHeight);
+      const last = Math.ceil((this.scrollTop + height) / rowHeight);
+      return {
+        items,
+        total,
+        rowHeight,
+        start: Math.max(0, first - overscan),
+        end: Math.min(items.length, last + overscan),
+        wanted: last + overscan,
+      };
+    },
+    settle() {
+      if (this.rowHeight == null && this.measured == null) {
+        const row = this.$el?.firstElementChild?.firstElementChild;
+        if (row?.offsetHeight) {
+          this.measured = row.offsetHeight;
+        }
+      }
+      this.loadMore();
+    },
+    async loadMore() {
+      const { items, total, wanted } = this.visible();
+      if (
+        !this.loadPage ||
+        this.loading ||
+        items.length >= total ||
+        wanted < items.length
+      ) {
+        return;
+      }
+      this.loading = true;
+      try {
+        const page = await this.loadPage(items.length, this.pageSize);
+        items.push(...page.items);
+        this.source.total = page.total;
+      } catch (e) {
+        // tried again on the next scroll
+        console.warn(e);
+      } finally {
+        this.loading = false;
+      }
+    },
+  },
+  render() {
+    const { items, total, rowHeight, start, end } = this.visible();
+    const rows = [];
+    for (let i = start; i < end; i++) {
+      rows.push(this.renderRow(items[i]));
+    }
+    return h(
+      "div",
+      {
+        style: { height: `${this.height}px`, overflowY: "auto" },
+        onScroll: (e) => {
+          this.scrollTop = e.target.scrollTop;
+          this.loadMore();
+        },
+      },
+      [
+        h(
+          "div",
+          {
+            style: {
+              height: `${total * rowHeight}px`,
+              paddingTop: `${start * rowHeight}px`,
+              boxSizing: "border-box",
+            },
+          },
+          rows
+        ),
+      ]
+    );
+  },
+};
+// px, until a row has been measured
+const VIRTUAL_LIST_ROW_HEIGHT = 32;
 function interpretAppend({ value, iterable }, ctx) {
   const items = interpret(iterable, ctx);
   const val = interpret(value, ctx);
@@ -521,9 +1753,9 @@ function doCompare(l, r, op) {
       return l === r;
     case "neq":
       return l !== r;
-    case "lte":
+    case "lt":
       return l < r;
-    case "le":
+    case "lte":
       return l <= r;
     case "gt":
       return l > r;
@@ -554,12 +1786,8 @@ function interpretProps(props, ctx) {
     let val = rawVal;
     // if key starts with on, it's an event listener
     if (key.match(/^on[A-Z]/)) {
-      let handler = async (evt) => {
-        const newCtx = new Scope(ctx.component);
-        newCtx.locals = new Map(ctx.locals);
-        newCtx.locals.set("$event", evt);
-        return await interpretAsync(rawVal, newCtx);
-      };
+      let handler = async (evt) =>
+        await interpretAsync(rawVal, ctx.child("$event", evt));
       // if multiple parts, it was a tuple. use first part as key, rest as modifiers
       if (modifiers.length) {
         handler = withModifiers(handler, modifiers);
@@ -576,8 +1804,29 @@ function interpretProps(props, ctx) {
 /**
  * utils
  */
-function queryObject(obj, query) {
-  return query.split(".").reduce((a, b) => a[b], obj);
+function queryPath(obj, path) {
+  for (const part of path) {
+    obj = obj[part];
+  }
+  return obj;
+}
+// applies add/remove/replace ops with list paths, see pue/live.py
+function applyPatch(root, ops) {
+  for (const { op, path, value } of ops) {
+    const parent = queryPath(root, path.slice(0, -1));
+    const key = path[path.length - 1];
+    if (Array.isArray(parent) && op !== "replace") {
+      if (op === "add") {
+        parent.splice(key, 0, value);
+      } else {
+        parent.splice(key, 1);
+      }
+    } else if (op === "remove") {
+      delete parent[key];
+    } else {
+      parent[key] = value;
+    }
+  }
 }
 function transformValues(obj, transform) {
   if (!obj) {
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import json
+from typing import Any, Dict, Hashable, List
+from .encoder import encode
+
+# compact wire format for component bundles (Component.compact)
+# generated templates repeat the same long class strings and whole subtrees
+# (rows, cards) over and over. strings and AST nodes that are used more than
+# once, and long enough to be worth it, go into a table under the bundle's "$"
+# key and every use becomes a reference to it, {"$": index}. table entries can
+# reference other entries, client.js resolves them in place so every use of an
+# entry is the same object
+#
+#   {"template": {..., "children": [{"$": 0}, {"$": 0}]}, "$": [{"kind": ...}]}
+#
+# bundles with a "$" key anywhere in them (a Dictionary, props) can't tell refs
+# apart from their own objects, those are sent as plain json
+
+REF = "$"
+# {"$":123}, what a reference costs
+_REF_SIZE = 9
+
+
+class _Unrepresentable(Exception):
+    pass
+
+
+def encode_compact(value: Any) -> bytes:
+    body = encode(value)
+    tree = json.loads(body)
+    compactor = _Compactor()
+    try:
+        for field in tree.values():
+            compactor.shape(field)
+    except _Unrepresentable:
+        return body
+    for field in tree.values():
+        compactor.count(field)
+    out = {name: compactor.emit(field) for name, field in tree.items()}
+    if not compactor.table:
+        return body
+    out[REF] = compactor.table
+    return json.dumps(out, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class _Compactor:
+    def __init__(self):
+        # structurally identical values get the same shape id, by a key made
+        # of their children's shape ids, so every node is hashed once
+        self.shapes: Dict[Hashable, int] = {}
+        # id() of every dict/list -> its shape
+        self.containers: Dict[int, int] = {}
+        self.sizes: List[int] = []
+        # times each shape occurs in the bundle
+        self.counts: List[int] = []
+        # only strings and AST nodes go in the table
+        self.candidates: List[bool] = []
+        # times each shape is written out, leaving out uses inside another
+        # tabled value after the first
+        self.uses: List[int] = []
+        self.slots: Dict[int, int] = {}
+        self.table: List[Any] = []
+
+    def shape(self, value: Any) -> int:
+        # json.loads only makes exact dicts, lists and strs
+        cls = value.__class__
+        candidate = False
+        if cls is str:
+            key: Hashable = value
+            size = len(value) + 2
+            candidate = True
+        elif cls is dict:
+            if REF in value:
+                raise _Unrepresentable
+            fields = []
+            size = 1
+            for k, v in value.items():
+                shape = self.shape(v)
+                fields.append(k)
+                fields.append(shape)
+                size += len(k) + 4 + self.sizes[shape]
+            key = ("{", *fields)
+            candidate = "kind" in value
+        elif cls is list:
+            items = []
+            size = 1
+            for v in value:
+                shape = self.shape(v)
+                items.append(shape)
+                size += self.sizes[shape] + 1
+            key = ("[", *items)
+        else:
+            # True == 1 in python, keep them apart
+            key = (cls, value)
+            size = 5
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = len(self.sizes)
+            self.sizes.append(size)
+            self.candidates.append(candidate)
+            self.counts.append(0)
+            self.uses.append(0)
+        self.counts[shape] += 1
+        if cls is dict or cls is list:
+            self.containers[id(value)] = shape
+        return shape
+
+    def worth(self, shape: int, uses: int) -> bool:
+        # one copy in the table plus a ref per use, against a copy per use
+        size = self.sizes[shape]
+        return uses > 1 and uses * size > size + 1 + uses * _REF_SIZE
+
+    def count(self, value: Any):
+        cls = value.__class__
+        if cls is str:
+            self.uses[self.shapes[value]] += 1
+            return
+        if cls is not dict and cls is not list:
+            return
+        shape = self.containers[id(value)]
+        if self.candidates[shape]:
+            self.uses[shape] += 1
+            # a tabled value is written out once however often it's used
+            if self.uses[shape] > 1 and self.worth(shape, self.counts[shape]):
+                return
+        for v in value.values() if cls is dict else value:
+            self.count(v)
+
+    def emit(self, value: Any) -> Any:
+        cls = value.__class__
+        if cls is str:
+            shape = self.shapes[value]
+        elif cls is dict or cls is list:
+            shape = self.containers[id(value)]
+        else:
+            return value
+        if not (self.candidates[shape] and self.worth(shape, self.uses[shape])):
+            return self._emit_children(value)
+        slot = self.slots.get(shape)
+        if slot is None:
+            slot = self.slots[shape] = len(self.table)
+            self.table.append(None)
+            self.table[slot] = self._emit_children(value)
+        return {REF: slot}
+
+    def _emit_children(self, value: Any) -> Any:
+        cls = value.__class__
+        if cls is dict:
+            return {k: self.emit(v) for k, v in value.items()}
+        if cls is list:
+            return [self.emit(v) for v in value]
+        return value
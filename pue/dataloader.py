@@ -0,0 +1,171 @@
+from __future__ import annotations
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Set,
+    TYPE_CHECKING,
+    TypeVar,
+)
+from fastapi import Request
+
+if TYPE_CHECKING:
+    from .metrics import Observation
+
+# request-scoped data loading, shared by every hook of every component rendered
+# for the same request (the batch endpoint, the index page etc.)
+# loads of the same key are deduplicated, and loads made in the same event loop
+# tick are coalesced into one call of the batch function, dataloader style:
+#
+#   async def load_users(ids: List[int]) -> List[User]: ...
+#
+#   class Profile(pue.Component):
+#       async def async_data(self):
+#           user = await pue.loader(load_users).load(1)
+#
+# the batch function returns values in key order, or a mapping by key. a value
+# that is an Exception fails only its own key. if the batch function raises,
+# every load waiting on that batch raises the very same exception object, so
+# handlers shouldn't mutate it. failed keys aren't cached and are retried by
+# the next load
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+BatchFn = Callable[[List[K]], Awaitable[Sequence[V] | Mapping[K, V]]]
+
+# where the RequestScope lives in the asgi scope
+SCOPE_KEY = "pue.request_scope"
+
+_current: ContextVar[RequestScope | None] = ContextVar(
+    "pue_request_scope", default=None
+)
+
+
+class DataLoader(Generic[K, V]):
+    def __init__(self, batch_fn: BatchFn[K, V], max_batch_size: int | None = None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        # results, and loads still in flight, by key
+        self._futures: Dict[K, asyncio.Future[V]] = {}
+        self._queue: List[K] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self.loads = 0
+        self.keys = 0
+        self.batches = 0
+
+    async def load(self, key: K) -> V:
+        # shielded, a cancelled caller shouldn't cancel the load for everyone else
+        return await asyncio.shield(self._future(key))
+
+    async def load_many(self, keys: Sequence[K]) -> List[V]:
+        # all keys are queued before yielding, so they end up in the same batch
+        futures = [asyncio.shield(self._future(key)) for key in keys]
+        return list(await asyncio.gather(*futures))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "loads": self.loads,
+            "keys": self.keys,
+            "batches": self.batches,
+            "deduplicated": self.loads - self.keys,
+        }
+
+    def _future(self, key: K) -> asyncio.Future[V]:
+        self.loads += 1
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                # everything queued by the time the loop gets to this is one batch
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return future
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        size = self.max_batch_size or len(keys)
+        for i in range(0, len(keys), size):
+            task = asyncio.ensure_future(self._load_batch(keys[i : i + size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, keys: List[K]):
+        self.batches += 1
+        self.keys += len(keys)
+        try:
+            values = await self.batch_fn(keys)
+            if isinstance(values, Mapping):
+                values = [values.get(key) for key in keys]
+            if len(values) != len(keys):
+                raise ValueError(
+                    f"{self.batch_fn.__name__} returned {len(values)} values for {len(keys)} keys"
+                )
+        except Exception as e:
+            # anything the batch function raises belongs to every key in the
+            # batch, there is no telling which key caused it
+            for key in keys:
+                # not cached, so a later load can retry
+                self._futures.pop(key).set_exception(e)
+            return
+        for key, value in zip(keys, values):
+            future = self._futures[key]
+            if isinstance(value, Exception):
+                del self._futures[key]
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+
+class RequestScope:
+    def __init__(self):
+        self.loaders: Dict[Callable, DataLoader] = {}
+        # timings etc. recorded while rendering, see pue.metrics
+        self.observations: List[Observation] = []
+
+    def loader(self, batch_fn: BatchFn[K, V], **kwargs: Any) -> DataLoader[K, V]:
+        loader = self.loaders.get(batch_fn)
+        if loader is None:
+            loader = self.loaders[batch_fn] = DataLoader(batch_fn, **kwargs)
+        return loader
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {fn.__name__: loader.stats() for fn, loader in self.loaders.items()}
+
+
+def loader(batch_fn: BatchFn[K, V], **kwargs: Any) -> DataLoader[K, V]:
+    # the current request's loader for batch_fn, from any component hook or action
+    scope = _current.get()
+    if scope is None:
+        raise RuntimeError("pue.loader() used outside of a component render or action")
+    return scope.loader(batch_fn, **kwargs)
+
+
+def current() -> RequestScope | None:
+    return _current.get()
+
+
+def request_scope(req: Request) -> RequestScope:
+    return req.scope.setdefault(SCOPE_KEY, RequestScope())
+
+
+@contextmanager
+def bind(req: Request | None) -> Iterator[RequestScope]:
+    # makes req's scope current, tasks started inside (e.g. by asyncio.gather) inherit it
+    # without a request (scripts, benchmarks) loaders only last for the block
+    scope = request_scope(req) if req is not None else RequestScope()
+    token = _current.set(scope)
+    try:
+        yield scope
+    finally:
+        _current.reset(token)
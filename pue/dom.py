@@ -7,7 +7,8 @@ def node(type_val: str, type_type: Literal["string", "component"]):
     def builder(
         *children: m.Template, props: Dict[m.PropKey, m.Script] = {}, **kwargs: m.Script
     ):
-        return m.VNode(
+        return m.build(
+            m.VNode,
             v_node_type_type=type_type,
             v_node_type_val=type_val,
             children=list(children),
@@ -0,0 +1,230 @@
+from __future__ import annotations
+import math
+from json.encoder import encode_basestring
+from typing import Any, Callable, Collection, Dict, List, Tuple, Type
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# fast json encoder for pue models
+# walks an AST/VNode tree straight to json bytes instead of going through
+# response_model validation and pydantic's generic serializer. output is
+# byte-for-byte identical to model.model_dump_json(by_alias=True)
+
+Encoder = Callable[[Any, List[str]], None]
+
+
+def encode(value: Any) -> bytes:
+    out: List[str] = []
+    _encode(value, out)
+    return "".join(out).encode()
+
+
+def _encode(value: Any, out: List[str]):
+    enc = _ENCODERS.get(value.__class__)
+    if enc is None:
+        enc = _encoder_for(value.__class__)
+    enc(value, out)
+
+
+def _encode_str(value: str, out: List[str]):
+    out.append(encode_basestring(value))
+
+
+def _encode_none(value: None, out: List[str]):
+    out.append("null")
+
+
+def _encode_bool(value: bool, out: List[str]):
+    out.append("true" if value else "false")
+
+
+def _encode_int(value: int, out: List[str]):
+    out.append(str(value))
+
+
+def _encode_float(value: float, out: List[str]):
+    # json has no Infinity/NaN, pydantic writes null for them. finite floats
+    # are formatted by pydantic, which differs from repr (1e20, 0.00001)
+    if math.isfinite(value):
+        out.append(to_json(value).decode())
+    else:
+        out.append("null")
+
+
+def _encode_list(value: List[Any] | tuple, out: List[str]):
+    if not value:
+        out.append("[]")
+        return
+    sep = "["
+    for item in value:
+        out.append(sep)
+        enc = _ENCODERS.get(item.__class__)
+        if enc is None:
+            enc = _encoder_for(item.__class__)
+        enc(item, out)
+        sep = ","
+    out.append("]")
+
+
+def _encode_dict(value: Dict[Any, Any], out: List[str]):
+    if not value:
+        out.append("{}")
+        return
+    sep = "{"
+    for k, v in value.items():
+        out.append(sep)
+        out.append(encode_basestring(k) if k.__class__ is str else _encode_key(k))
+        out.append(":")
+        enc = _ENCODERS.get(v.__class__)
+        if enc is None:
+            enc = _encoder_for(v.__class__)
+        enc(v, out)
+        sep = ","
+    out.append("}")
+
+
+def _encode_key(key: Any) -> str:
+    # tuple prop keys (event modifiers) are joined, same as pydantic
+    if key.__class__ is tuple:
+        return encode_basestring(",".join(key))
+    # int/float/bool/enum etc keys, stringified however pydantic does it
+    return to_json({key: None}).decode()[1 : -len(":null}")]
+
+
+def _encode_other(value: Any, out: List[str]):
+    # datetimes, enums etc - defer to pydantic so formatting matches exactly
+    out.append(to_json(value).decode())
+
+
+_ENCODERS: Dict[type, Encoder] = {
+    str: _encode_str,
+    type(None): _encode_none,
+    bool: _encode_bool,
+    int: _encode_int,
+    float: _encode_float,
+    list: _encode_list,
+    tuple: _encode_list,
+    dict: _encode_dict,
+}
+
+
+def _encoder_for(cls: type) -> Encoder:
+    if issubclass(cls, BaseModel):
+        enc = _model_encoder(cls)
+    elif issubclass(cls, (list, tuple)):
+        enc = _encode_list
+    elif issubclass(cls, dict):
+        enc = _encode_dict
+    else:
+        enc = _encode_other
+    _ENCODERS[cls] = enc
+    return enc
+
+
+def _model_encoder(cls: Type[BaseModel]) -> Encoder:
+    from .models import AST
+
+    alias_generator = cls.model_config.get("alias_generator")
+
+    def key(name: str, alias: str | None) -> str:
+        if alias is None:
+            alias = alias_generator(name) if callable(alias_generator) else name
+        return encode_basestring(alias) + ":"
+
+    # (attribute name, '"key":' prefix, is computed) in serialization order
+    entries = [
+        (name, key(name, field.serialization_alias or field.alias), False)
+        for name, field in cls.model_fields.items()
+        if not field.exclude
+    ] + [
+        (name, key(name, field.alias), True)
+        for name, field in cls.model_computed_fields.items()
+    ]
+    tail = ""
+    if issubclass(cls, AST) and entries and entries[-1][0] == "kind":
+        # AST.kind is just the class name, bake it into the closing brace
+        tail = entries.pop()[1] + encode_basestring(cls.__name__)
+    plan = [
+        (name, ("{" if i == 0 else ",") + k, is_computed)
+        for i, (name, k, is_computed) in enumerate(entries)
+    ]
+    if tail:
+        end = ("," if plan else "{") + tail + "}"
+    else:
+        end = "}" if plan else "{}"
+
+    omit_none = getattr(cls, "omit_none", None)
+    if omit_none:
+        return _omit_none_encoder(entries, tail, omit_none)
+
+    def encode_model(value: Any, out: List[str]):
+        attrs = value.__dict__
+        for name, part, is_computed in plan:
+            out.append(part)
+            v = getattr(value, name) if is_computed else attrs[name]
+            enc = _ENCODERS.get(v.__class__)
+            if enc is None:
+                enc = _encoder_for(v.__class__)
+            enc(v, out)
+        out.append(end)
+
+    return encode_model
+
+
+def _omit_none_encoder(
+    entries: List[Tuple[str, str, bool]], tail: str, omit_none: Collection[str]
+) -> Encoder:
+    # same as encode_model, but fields in omit_none are skipped when None, so
+    # the separator before each key is only known at encode time
+    plan = [
+        (name, k, is_computed, name in omit_none) for name, k, is_computed in entries
+    ]
+    if plan and not plan[0][3]:
+        # the first field is always there (e.g. AST.is_async), so every other
+        # separator is a comma and can be baked in like encode_model's
+        return _leading_field_encoder(plan, tail)
+
+    def encode_model(value: Any, out: List[str]):
+        attrs = value.__dict__
+        sep = "{"
+        for name, k, is_computed, omit in plan:
+            v = getattr(value, name) if is_computed else attrs[name]
+            if v is None and omit:
+                continue
+            out.append(sep + k)
+            sep = ","
+            enc = _ENCODERS.get(v.__class__)
+            if enc is None:
+                enc = _encoder_for(v.__class__)
+            enc(v, out)
+        if tail:
+            out.append(sep + tail + "}")
+        else:
+            out.append("}" if sep == "," else "{}")
+
+    return encode_model
+
+
+def _leading_field_encoder(
+    plan: List[Tuple[str, str, bool, bool]], tail: str
+) -> Encoder:
+    parts = [
+        (name, ("{" if i == 0 else ",") + k, is_computed, omit)
+        for i, (name, k, is_computed, omit) in enumerate(plan)
+    ]
+    end = "," + tail + "}" if tail else "}"
+
+    def encode_model(value: Any, out: List[str]):
+        attrs = value.__dict__
+        for name, part, is_computed, omit in parts:
+            v = getattr(value, name) if is_computed else attrs[name]
+            if v is None and omit:
+                continue
+            out.append(part)
+            enc = _ENCODERS.get(v.__class__)
+            if enc is None:
+                enc = _encoder_for(v.__class__)
+            enc(v, out)
+        out.append(end)
+
+    return encode_model
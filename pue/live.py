@@ -0,0 +1,222 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Set, Tuple, Type
+from fastapi import Request, WebSocket, WebSocketDisconnect
+from pydantic.alias_generators import to_camel
+from . import models as m
+from .encoder import encode
+
+# live updates for components marked `Component.live`, over a websocket on the
+# config api. clients subscribe to the live components they are showing, and
+# whenever one is re-rendered (`Component.async_push`, or every
+# `Component.live_interval` seconds) each subscriber gets a patch against the
+# template/data it was last sent instead of the whole payload
+#
+# client -> server: {"subscribe": name, "bundle": hash} / {"unsubscribe": name}
+# server -> client: {"component": name, "patch": [op, ...]}
+# ops are {"op": "add" | "remove" | "replace", "path": [...], "value": ...}, like
+# json patch but with list paths rooted at "template" or "data". "add" on a list
+# inserts at the index
+
+Patch = List[Dict[str, Any]]
+
+logger = logging.getLogger("pue")
+
+# open connections by the components they are subscribed to
+_subscribers: Dict[Type[m.Component], Set[Connection]] = defaultdict(set)
+
+
+async def push(component: Type[m.Component]):
+    await asyncio.gather(
+        *[conn.update(component) for conn in list(_subscribers[component])]
+    )
+
+
+class Connection:
+    def __init__(self, ws: WebSocket, components: Dict[str, Type[m.Component]]):
+        self.ws = ws
+        self.components = components
+        # last response sent for each subscribed component
+        self.sent: Dict[Type[m.Component], m.ComponentEndpointResponse] = {}
+        self.timers: Dict[Type[m.Component], asyncio.Task] = {}
+        self.lock = asyncio.Lock()
+
+    async def serve(self):
+        await self.ws.accept()
+        try:
+            while True:
+                message = _message(await self.ws.receive_text())
+                if message is None:
+                    # one bad frame shouldn't drop every subscription on the socket
+                    logger.warning("ignoring malformed live message")
+                    continue
+                kind, name, bundle = message
+                component = self.components.get(name)
+                if component is None or not component.live:
+                    continue
+                if kind == "subscribe":
+                    try:
+                        await self.subscribe(component, bundle)
+                    except Exception:
+                        logger.exception("live subscribe to %s failed", name)
+                else:
+                    self.unsubscribe(component)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for component in list(self.sent):
+                self.unsubscribe(component)
+
+    async def subscribe(self, component: Type[m.Component], bundle: str | None):
+        async with self.lock:
+            res = await component.async_endpoint(self.request())
+            self.sent[component] = res
+            _subscribers[component].add(self)
+            # the client's data may be older than this render, always resend it
+            patch: Patch = [_op("replace", ["data"], res.data)]
+            rendered = m.RenderedComponent.from_response(res, component.compact)
+            if rendered.bundle.hash != bundle:
+                patch.insert(0, _op("replace", ["template"], res.template))
+            await self.send(component, patch)
+        if component.live_interval and component not in self.timers:
+            self.timers[component] = asyncio.create_task(self.poll(component))
+
+    def unsubscribe(self, component: Type[m.Component]):
+        self.sent.pop(component, None)
+        _subscribers[component].discard(self)
+        timer = self.timers.pop(component, None)
+        if timer is not None:
+            timer.cancel()
+
+    async def poll(self, component: Type[m.Component]):
+        while True:
+            await asyncio.sleep(component.live_interval or 0)
+            try:
+                await self.update(component)
+            except Exception:
+                # keep polling, the next render may well succeed
+                logger.exception("live update of %s failed", component.name())
+
+    async def update(self, component: Type[m.Component]):
+        async with self.lock:
+            previous = self.sent.get(component)
+            if previous is None:
+                return
+            res = await component.async_endpoint(self.request())
+            patch: Patch = []
+            diff(previous.template, res.template, ["template"], patch)
+            diff(previous.data, res.data, ["data"], patch)
+            self.sent[component] = res
+            if patch:
+                await self.send(component, patch)
+
+    def request(self) -> Request:
+        # components render against the request that opened the socket, but
+        # each render gets its own state (and so its own data loaders)
+        return Request({**self.ws.scope, "type": "http", "method": "GET", "state": {}})
+
+    async def send(self, component: Type[m.Component], patch: Patch):
+        message = encode({"component": component.name(), "patch": patch})
+        try:
+            await self.ws.send_text(message.decode())
+        except (WebSocketDisconnect, RuntimeError):
+            # closed while rendering, serve() cleans up
+            pass
+
+
+def _message(text: str) -> Tuple[str, str, str | None] | None:
+    # ("subscribe" | "unsubscribe", component name, bundle hash), None if the
+    # client sent anything else
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(message, dict):
+        return None
+    bundle = message.get("bundle")
+    if bundle is not None and not isinstance(bundle, str):
+        return None
+    for kind in ("subscribe", "unsubscribe"):
+        if isinstance(message.get(kind), str):
+            return kind, message[kind], bundle
+    return None
+
+
+def diff(old: Any, new: Any, path: List[Any], patch: Patch):
+    # appends the ops turning old into new to patch
+    if old is new:
+        return
+    if isinstance(old, m.AST) and old.__class__ is new.__class__:
+        omit_none = old.omit_none
+        for name, field in old.__class__.model_fields.items():
+            if field.exclude:
+                continue
+            key = field.serialization_alias or field.alias or to_camel(name)
+            before, after = getattr(old, name), getattr(new, name)
+            if name in omit_none and (before is None) != (after is None):
+                # these are left out of the json when None, so the client sees
+                # the key come and go rather than a null (e.g. VNode.static)
+                if after is None:
+                    patch.append(_op("remove", [*path, key]))
+                else:
+                    patch.append(_op("add", [*path, key], after))
+                continue
+            diff(before, after, [*path, key], patch)
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                patch.append(_op("remove", [*path, _key(key)]))
+        for key, value in new.items():
+            if key in old:
+                diff(old[key], value, [*path, _key(key)], patch)
+            else:
+                patch.append(_op("add", [*path, _key(key)], value))
+        return
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+        _diff_list(old, new, path, patch)
+        return
+    if not _same(old, new):
+        patch.append(_op("replace", path, new))
+
+
+def _diff_list(old: List[Any], new: List[Any], path: List[Any], patch: Patch):
+    # unchanged items at either end are skipped, so inserting or removing
+    # items anywhere in a list is one op per item rather than a diff of
+    # everything after it
+    n = min(len(old), len(new))
+    start = 0
+    while start < n and _same(old[start], new[start]):
+        start += 1
+    end = 0
+    while end < n - start and _same(old[-1 - end], new[-1 - end]):
+        end += 1
+    old_mid = old[start : len(old) - end]
+    new_mid = new[start : len(new) - end]
+    common = min(len(old_mid), len(new_mid))
+    for i in range(common):
+        diff(old_mid[i], new_mid[i], [*path, start + i], patch)
+    # from the back, so earlier indices stay valid
+    for i in reversed(range(common, len(old_mid))):
+        patch.append(_op("remove", [*path, start + i]))
+    for i in range(common, len(new_mid)):
+        patch.append(_op("add", [*path, start + i], new_mid[i]))
+
+
+def _same(a: Any, b: Any) -> bool:
+    # 1 == True in python but not in js
+    return a.__class__ is b.__class__ and a == b
+
+
+def _key(key: m.PropKey) -> str:
+    # tuple prop keys are joined on the wire, see pue.encoder
+    return ",".join(key) if isinstance(key, tuple) else key
+
+
+def _op(op: str, path: List[Any], value: Any = None) -> Dict[str, Any]:
+    if op == "remove":
+        return {"op": op, "path": path}
+    return {"op": op, "path": path, "value": value}
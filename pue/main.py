@@ -1,11 +1,38 @@
 from __future__ import annotations
+import asyncio
+import json
+import logging
 import os
-from typing import List
-from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse, HTMLResponse
+from json.encoder import encode_basestring
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from pydantic import ValidationError
 from . import models as m
+from .encoder import encode
+from .live import Connection
+from .cache import RenderCache
+from .metrics import ClientProfile, MetricsCallback, Stats, StatsMiddleware
+from .payload import IMMUTABLE, Payload, StaticFile
+from .render import RenderError, render_response
+from .router import resolve
+from .static import load
 
 _DIR = os.path.dirname(os.path.realpath(__file__))
+logger = logging.getLogger("pue")
+
+# serialized json, from memory or memory-mapped from disk
+Body = bytes | memoryview
 
 
 class Pue:
@@ -13,28 +40,79 @@ class Pue:
     # catch all route for / so we can use vue-router WebHistory
     index_path = "/"
 
-    def __init__(self, routes: List[m.Route]):
+    def __init__(
+        self,
+        routes: List[m.Route],
+        ssr: bool = False,
+        static_dir: str | None = None,
+        metrics: MetricsCallback | None = None,
+        profile: bool = False,
+    ):
         self._routes = routes
+        # render timings/sizes, see pue.metrics
+        self.stats = Stats()
+        self.metrics = metrics
+        # tag nodes with their source lines and collect client render timings
+        self.profile = profile
+        self.client_profile = ClientProfile()
+        if profile:
+            m.set_profiling(True)
+        # render matched components to html on the server for first paint
+        self.ssr = ssr
+        self._components: Dict[str, Type[m.Component]] = {}
+        # bundles recently sent to clients, by hash
+        self._bundles = RenderCache(maxsize=1024)
+        # route config and client are static, serialize/read them once up front
+        self._routes_payload = Payload(encode(m.RouteConfigResponse(routes=routes)))
+        with open(f"{_DIR}/client.js", "rb") as f:
+            self._client_js = Payload(f.read(), media_type="application/javascript")
+        # fingerprinted url for the import map, can be cached forever
+        self.client_js_path = f"/client.{self._client_js.hash}.js"
         self.config_api = self._build_config_api()
         self.index_api = self._build_index_api()
+        # serve payloads exported by pue.static from disk instead of rendering them
+        self._static: Dict[str, StaticFile] = (
+            load(self, static_dir) if static_dir else {}
+        )
 
     def _build_config_api(self):
         app = FastAPI()
-        app.get(
-            "/client.js",
-            response_class=FileResponse,
-        )(self.async_js_endpoint)
+        app.add_middleware(StatsMiddleware, stats=self.stats, callback=self.metrics)
+        app.get("/client.js")(self.async_js_endpoint)
+        app.get("/client.{fingerprint}.js")(self.async_fingerprinted_js_endpoint)
         app.get(
             "/routes",
             response_model=m.RouteConfigResponse,
         )(self.async_routes_endpoint)
+        app.get(
+            "/components",
+            response_model=m.ComponentBatchResponse,
+        )(self.async_components_endpoint)
+        app.get(
+            "/data",
+            response_model=m.ComponentDataResponse,
+        )(self.async_data_endpoint)
+        app.get(
+            "/bundles/{digest}",
+            response_model=m.ComponentBundle,
+        )(self.async_bundle_endpoint)
+        app.get("/stats")(self.async_stats_endpoint)
+        if self.profile:
+            app.post("/profile")(self.async_profile_report_endpoint)
+            app.get("/profile")(self.async_profile_endpoint)
+        app.websocket("/live")(self.async_live_endpoint)
+        app.post(
+            "/actions",
+            response_model=m.ActionBatchResponse,
+        )(self.async_actions_endpoint)
 
         def add_component_route(route: m.Route):
             if route.component:
+                self._components[route.component.name()] = route.component
                 app.get(
                     "/" + route.component.endpoint_path(),
                     response_model=m.ComponentEndpointResponse,
-                )(route.component.async_endpoint)
+                )(self._component_endpoint(route.component))
             for child in route.children:
                 add_component_route(child)
 
@@ -42,27 +120,251 @@ class Pue:
             add_component_route(route)
         return app
 
-    async def async_js_endpoint(self, req: Request) -> FileResponse:
-        return FileResponse(
-            f"{_DIR}/client.js",
-            headers={
-                "Content-Type": "application/javascript",
-                "Cache-Control": "no-cache",
-            },
+    async def async_js_endpoint(self, req: Request) -> Response:
+        return self._client_js.response(req)
+
+    async def async_fingerprinted_js_endpoint(
+        self, req: Request, fingerprint: str
+    ) -> Response:
+        if fingerprint != self._client_js.hash:
+            raise HTTPException(status_code=404, detail="stale client.js fingerprint")
+        return self._client_js.response(req, cache_control=IMMUTABLE)
+
+    async def async_routes_endpoint(self, req: Request) -> Response:
+        if "routes" in self._static:
+            return self._static["routes"].response(req)
+        return self._routes_payload.response(req)
+
+    def _component_endpoint(self, component: Type[m.Component]):
+        async def async_component_endpoint(req: Request) -> Response:
+            static = self._static_payload(component)
+            if static is not None:
+                return static.response(req)
+            return await component.async_response(req)
+
+        return async_component_endpoint
+
+    def _static_payload(self, component: Type[m.Component]) -> StaticFile | None:
+        if component.dynamic:
+            return None
+        return self._static.get(component.endpoint_path())
+
+    async def _async_parts(
+        self, req: Request, component: Type[m.Component]
+    ) -> Tuple[str, Body, Body]:
+        # (bundle hash, bundle, data) for a component
+        static = self._static_payload(component)
+        if static is not None and static.bundle is not None:
+            bundle = self._static[f"bundles/{static.bundle}"].body
+            return static.bundle, bundle, _data_of(static.body, bundle)
+        return self._register(await component.async_rendered(req))
+
+    def _register(self, rendered: m.RenderedComponent) -> Tuple[str, Body, Body]:
+        # remember bundles handed out so they can be fetched again by hash
+        self._bundles.set(rendered.bundle.hash, rendered)
+        return rendered.bundle.hash, rendered.bundle.body, rendered.data
+
+    async def _async_data(self, req: Request, component: Type[m.Component]) -> Body:
+        static = self._static_payload(component)
+        if static is not None and static.bundle is not None:
+            bundle = self._static[f"bundles/{static.bundle}"].body
+            return _data_of(static.body, bundle)
+        return await component.async_data_payload(req)
+
+    def _lookup(self, names: str) -> List[Type[m.Component]]:
+        components: List[Type[m.Component]] = []
+        for name in dict.fromkeys(names.split(",")):
+            if name not in self._components:
+                raise HTTPException(
+                    status_code=404, detail=f"unknown component: {name}"
+                )
+            components.append(self._components[name])
+        return components
+
+    async def async_components_endpoint(
+        self, req: Request, names: str, have: str = ""
+    ) -> Response:
+        # batch of components (e.g. a whole matched route chain) in one round trip
+        # bundles the client says it already has (by hash) are left out
+        components = self._lookup(names)
+        parts = await asyncio.gather(*[self._async_parts(req, c) for c in components])
+        body = _batch_object(components, parts, set(have.split(",")))
+        return Payload(body).response(req)
+
+    async def async_data_endpoint(self, req: Request, names: str) -> Response:
+        # only the data, for components whose bundle the client already has
+        components = self._lookup(names)
+        data = await asyncio.gather(*[self._async_data(req, c) for c in components])
+        body = _json_object((c.name(), d) for c, d in zip(components, data))
+        return Payload(b'{"data":' + body + b"}").response(req)
+
+    async def async_bundle_endpoint(self, req: Request, digest: str) -> Response:
+        # content-addressed, so can be cached forever
+        static = self._static.get(f"bundles/{digest}")
+        if static is not None:
+            return static.response(req, cache_control=IMMUTABLE)
+        rendered = self._bundles.get(digest)
+        if rendered is None:
+            raise HTTPException(status_code=404, detail=f"unknown bundle: {digest}")
+        return rendered.bundle.response(req, cache_control=IMMUTABLE)
+
+    async def async_actions_endpoint(
+        self, req: Request, batch: m.ActionBatchRequest
+    ) -> Response:
+        # every action call made by a client in one frame, run concurrently
+        results = await asyncio.gather(
+            *[self._async_call(req, call) for call in batch.calls]
+        )
+        return Response(
+            b'{"results":[' + b",".join(results) + b"]}",
+            media_type="application/json",
+        )
+
+    async def _async_call(self, req: Request, call: m.ActionCall) -> bytes:
+        # ActionResult, errors are per call so one failure doesn't sink the batch
+        try:
+            component = self._lookup(call.component)[0]
+            value = await component.async_call(req, call.action, call.args)
+            return encode({"value": value})
+        except HTTPException as e:
+            return encode({"error": str(e.detail), "status": e.status_code})
+        except ValidationError as e:
+            return encode({"error": str(e), "status": 422})
+        except Exception:
+            logger.exception("action %s.%s failed", call.component, call.action)
+            return encode({"error": "internal server error", "status": 500})
+
+    async def async_stats_endpoint(self, req: Request) -> Response:
+        # {metric: [{labels, count, sum, max}]} since startup, see pue.metrics
+        return Response(encode(self.stats.snapshot()), media_type="application/json")
+
+    async def async_profile_report_endpoint(self, report: m.ProfileReport):
+        self.client_profile.add(report)
+
+    async def async_profile_endpoint(self, req: Request) -> Response:
+        # client render/script time by source line, most expensive first
+        return Response(
+            encode({"nodes": self.client_profile.snapshot()}),
+            media_type="application/json",
         )
 
-    async def async_routes_endpoint(self, req: Request):
-        return m.RouteConfigResponse(routes=self._routes)
+    async def async_live_endpoint(self, ws: WebSocket):
+        await Connection(ws, self._components).serve()
+
+    def _initial_state(
+        self,
+        components: List[Type[m.Component]],
+        parts: Sequence[Tuple[str, Body, Body]],
+    ) -> str:
+        # route config + bundles/data for the matched components, inlined into
+        # the index so the client can render without any further round trips
+        batch = _batch_object(components, parts, set())
+        state = self._routes_payload.body[:-1] + b"," + batch[1:]
+        # "<" only appears inside json strings, escape it so "</script>" can't end the block
+        return state.decode().replace("<", "\\u003c")
+
+    def _index_head(self) -> str:
+        opts = {"basePath": self.config_path, "profile": True} if self.profile else {}
+        return _index_head(self.config_path + self.client_js_path, opts)
+
+    def index_html(self) -> str:
+        # index page with only the route config inlined, components are fetched
+        return self._index_head() + _index_tail(self._initial_state([], []))
 
     def _build_index_api(self):
         app = FastAPI()
+        app.add_middleware(StatsMiddleware, stats=self.stats, callback=self.metrics)
         app.get("{full_path:path}", response_class=HTMLResponse)(
             self.async_default_index
         )
         return app
 
-    async def async_default_index(self):
-        return """\
+    async def async_default_index(self, req: Request, full_path: str) -> Response:
+        components = [
+            route.component
+            for route in resolve(self._routes, full_path)
+            if route.component
+        ]
+        if self.ssr:
+            # endpoints run before anything is sent, so their errors still
+            # become a proper error response
+            responses = await asyncio.gather(
+                *[c.async_endpoint(req) for c in components]
+            )
+            return StreamingResponse(
+                self._async_stream_index(full_path, components, responses),
+                media_type="text/html",
+            )
+        parts = await asyncio.gather(*[self._async_parts(req, c) for c in components])
+        state = self._initial_state(components, parts)
+        return HTMLResponse(self._index_head() + _index_tail(state))
+
+    async def _async_stream_index(
+        self,
+        full_path: str,
+        components: List[Type[m.Component]],
+        responses: List[m.ComponentEndpointResponse],
+    ) -> AsyncIterator[str]:
+        # send the head right away so the browser can start on the cdn scripts
+        yield self._index_head()
+
+        # each component renders the next one in the chain in its RouterView
+        def outlet(depth: int) -> Iterator[str]:
+            if depth == len(responses):
+                return iter(())
+            return render_response(
+                responses[depth], outlet=lambda: outlet(depth + 1), path=full_path
+            )
+
+        try:
+            for chunk in outlet(0):
+                yield chunk
+        except RenderError as e:
+            # the head is already sent, leave the rest of the page to the client
+            logger.debug("server render of %s stopped: %s", full_path, e)
+        parts = [
+            self._register(m.RenderedComponent.from_response(r, c.compact))
+            for c, r in zip(components, responses)
+        ]
+        state = self._initial_state(components, parts)
+        yield _index_tail(state)
+
+
+def _json_object(entries: Iterable[Tuple[str, Body]]) -> bytes:
+    # {key: value} from already serialized values
+    return (
+        b"{"
+        + b",".join(
+            encode_basestring(key).encode() + b":" + value for key, value in entries
+        )
+        + b"}"
+    )
+
+
+def _batch_object(
+    components: List[Type[m.Component]],
+    parts: Sequence[Tuple[str, Body, Body]],
+    have: Set[str],
+) -> bytes:
+    # ComponentBatchResponse
+    refs = _json_object(
+        (c.name(), b'{"bundle":"' + digest.encode() + b'","data":' + data + b"}")
+        for c, (digest, _, data) in zip(components, parts)
+    )
+    bundles = _json_object(
+        {digest: bundle for digest, bundle, _ in parts if digest not in have}.items()
+    )
+    return b'{"components":' + refs + b',"bundles":' + bundles + b"}"
+
+
+def _data_of(payload: Body, bundle: Body) -> Body:
+    # data out of a ComponentEndpointResponse body, see RenderedComponent.payload
+    return payload[len(bundle) - 1 + len(b',"data":') : -1]
+
+
+def _index_head(client_js: str, opts: Dict[str, object]) -> str:
+    return (
+        """\
 <!DOCTYPE html>
 <html class="h-full bg-gray-50">
 
@@ -74,7 +376,9 @@ class Pue:
         <script type="importmap">
             {
                 "imports": {
-                    "pue": "/_pue/client.js"
+                    "pue": """
+        + json.dumps(client_js)
+        + """
                 }
             }
         </script>
@@ -89,11 +393,15 @@ class Pue:
             import { pue } from "pue";
 
             // normal vue/vue router stuff
-            const app = Vue.createApp();
+            // root renders the router view, so the (possibly server rendered) contents
+            // of #app are replaced on mount instead of being compiled as a template
+            const app = Vue.createApp({ render: () => Vue.h(VueRouter.RouterView) });
             const history = VueRouter.createWebHistory();
 
-            // load pue config from server
-            const routes = await pue()
+            // load pue config from server (inlined in the page on first load)
+            const routes = await pue("""
+        + (json.dumps(opts) if opts else "")
+        + """)
 
             // pue routes are the only routes in this app
             // could be nested/only used for a part of the app
@@ -103,14 +411,26 @@ class Pue:
             });
 
             // normal vue stuff
+            // wait for the initial route so the server rendered html is swapped out in one go
             app.use(router)
+            await router.isReady()
             app.mount("#app");
         </script>
     </head>
 
     <body class="h-full">
-        <div id="app"><router-view></router-view></div>
+        <div id="app">"""
+    )
+
+
+def _index_tail(state: str) -> str:
+    return (
+        """</div>
+        <!-- route config and matched component payloads, picked up by pue() -->
+        <script type="application/json" id="pue-state">"""
+        + state
+        + """</script>
     </body>
 
-</html>
-        """.strip()
+</html>"""
+    )
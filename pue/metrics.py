@@ -0,0 +1,203 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from time import perf_counter
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    TYPE_CHECKING,
+    Tuple,
+    TypeVar,
+)
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .dataloader import SCOPE_KEY, RequestScope, current
+
+if TYPE_CHECKING:
+    from .models import NodeProfile, ProfileReport
+
+# instrumentation of component renders. while rendering, components record how
+# long each hook took, validating/optimizing/serializing the response and how
+# big the payload is into the request's scope (see pue.dataloader.bind), which
+# StatsMiddleware reports once the response starts:
+# - as a Server-Timing header, durations summed per name, e.g.
+#   "Todos.data;dur=1.20, Todos.serialize;dur=0.31, total;dur=2.05"
+# - to the Pue(metrics=...) callback, once per observation, with prometheus
+#   style names and labels. names ending in _total are counters (the value is
+#   the increment), the rest are histograms:
+#     pue_hook_seconds{component, hook}
+#     pue_validate_seconds{component}
+#     pue_optimize_seconds{component}
+#     pue_serialize_seconds{component}
+#     pue_payload_bytes{component, part="bundle" | "data"}
+#     pue_render_cache_hits_total{component}
+#     pue_request_seconds{route}
+# - into Stats, served from /_pue/stats
+
+T = TypeVar("T")
+Labels = Dict[str, str]
+MetricsCallback = Callable[[str, float, Labels], None]
+
+
+class Observation(NamedTuple):
+    name: str
+    value: float
+    labels: Labels
+    # Server-Timing metric name, for durations
+    timing: str | None = None
+
+
+def observe(name: str, value: float, timing: str | None = None, **labels: str):
+    # dropped outside of a request
+    scope = current()
+    if scope is not None:
+        scope.observations.append(Observation(name, value, labels, timing))
+
+
+@contextmanager
+def timed(name: str, timing: str, **labels: str) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, perf_counter() - start, timing, **labels)
+
+
+async def timed_call(call: Awaitable[T], name: str, timing: str, **labels: str) -> T:
+    with timed(name, timing, **labels):
+        return await call
+
+
+class Stats:
+    # count/sum/max of every metric by labels, since startup
+    def __init__(self):
+        self._series: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+
+    def add(self, name: str, value: float, labels: Labels):
+        key = (name, tuple(sorted(labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            self._series[key] = [1, value, value]
+        else:
+            series[0] += 1
+            series[1] += value
+            series[2] = max(series[2], value)
+
+    def snapshot(self) -> Dict[str, List[Dict[str, object]]]:
+        out: Dict[str, List[Dict[str, object]]] = {}
+        for (name, labels), (count, total, peak) in sorted(self._series.items()):
+            out.setdefault(name, []).append(
+                {"labels": dict(labels), "count": count, "sum": total, "max": peak}
+            )
+        return out
+
+
+class ClientProfile:
+    # node timings reported by clients running with pue({ profile: true }),
+    # summed by node kind and source line
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._nodes: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, report: ProfileReport):
+        for node in report.nodes:
+            key = (node.kind, node.loc)
+            totals = self._nodes.get(key)
+            if totals is None:
+                if len(self._nodes) >= self.maxsize:
+                    continue
+                totals = self._nodes[key] = [0, 0.0, 0.0]
+            totals[0] += node.count
+            totals[1] += node.total_ms
+            totals[2] += node.self_ms
+
+    def snapshot(self) -> List[NodeProfile]:
+        from .models import NodeProfile
+
+        # most expensive first
+        return sorted(
+            (
+                NodeProfile(
+                    kind=kind, loc=loc, count=count, total_ms=total, self_ms=own
+                )
+                for (kind, loc), (count, total, own) in self._nodes.items()
+            ),
+            key=lambda node: node.self_ms,
+            reverse=True,
+        )
+
+
+class StatsMiddleware:
+    # reports what the request's components recorded (see above), and the
+    # request's loader stats in an X-Pue-Loaders header, e.g.
+    # "load_users;loads=6;keys=2;batches=1;deduplicated=4". for streamed
+    # responses (ssr) the headers only cover what happened before the first
+    # chunk, the rest still goes to the callback and stats
+    def __init__(
+        self, app: ASGIApp, stats: Stats, callback: MetricsCallback | None = None
+    ):
+        self.app = app
+        self.stats = stats
+        self.callback = callback
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = perf_counter()
+        reported = 0
+
+        async def send_with_stats(message: Message):
+            nonlocal reported
+            request_scope: RequestScope | None = scope.get(SCOPE_KEY)
+            if message["type"] == "http.response.start":
+                elapsed = perf_counter() - start
+                route = getattr(scope.get("route"), "path", None) or "other"
+                self.report(
+                    Observation("pue_request_seconds", elapsed, {"route": route})
+                )
+                if request_scope is not None:
+                    headers = MutableHeaders(scope=message)
+                    loaders = _loaders_header(request_scope)
+                    if loaders:
+                        headers.append("X-Pue-Loaders", loaders)
+                    headers.append(
+                        "Server-Timing",
+                        _server_timing(request_scope.observations, elapsed),
+                    )
+            if request_scope is not None:
+                observations = request_scope.observations
+                for observation in observations[reported:]:
+                    self.report(observation)
+                reported = len(observations)
+            await send(message)
+
+        await self.app(scope, receive, send_with_stats)
+
+    def report(self, observation: Observation):
+        self.stats.add(observation.name, observation.value, observation.labels)
+        if self.callback is not None:
+            self.callback(observation.name, observation.value, observation.labels)
+
+
+def _loaders_header(scope: RequestScope) -> str:
+    return ", ".join(
+        ";".join([name, *(f"{k}={v}" for k, v in s.items())])
+        for name, s in scope.stats().items()
+    )
+
+
+def _server_timing(observations: List[Observation], total: float) -> str:
+    durations: Dict[str, float] = {}
+    for observation in observations:
+        if observation.timing is not None:
+            durations[observation.timing] = (
+                durations.get(observation.timing, 0) + observation.value
+            )
+    durations["total"] = total
+    return ", ".join(
+        f"{name};dur={value * 1000:.2f}" for name, value in durations.items()
+    )
@@ -1,18 +1,62 @@
 from __future__ import annotations
 import asyncio
-from typing import Any, Dict, List, Literal, Sequence, Tuple, Type, Union, cast
-from fastapi import Request
-from pydantic import BaseModel, Field, computed_field
+import inspect
+import os
+import sys
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ClassVar,
+    Dict,
+    Hashable,
+    List,
+    Literal,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+from fastapi import HTTPException, Request, Response
+from pydantic import (
+    BaseModel,
+    Field,
+    SerializationInfo,
+    SerializerFunctionWrapHandler,
+    computed_field,
+    model_serializer,
+    validate_call,
+)
 from pydantic.alias_generators import to_camel
 from abc import ABC, abstractmethod
+from .cache import RenderCache
+from .dataloader import bind
+from .metrics import observe, timed, timed_call
+from .encoder import encode
+from .compact import encode_compact
+from .payload import Payload
 
 
 # base
 class PueModel(BaseModel):
+    # fields left out of the json entirely when they are None (see pue.encoder),
+    # models that set this also need to serialize with _omit_none
+    omit_none: ClassVar[frozenset[str]] = frozenset()
+
     class Config:
         alias_generator = to_camel
         populate_by_name = True
 
+    def _omit_none(
+        self, handler: SerializerFunctionWrapHandler, info: SerializationInfo
+    ) -> Dict[str, Any]:
+        data = handler(self)
+        if not self.omit_none:
+            return data
+        omit = {to_camel(name) if info.by_alias else name for name in self.omit_none}
+        return {k: v for k, v in data.items() if v is not None or k not in omit}
+
 
 # scripting
 
@@ -21,13 +65,24 @@ Scope = Literal["local", "component"]
 
 
 class AST(PueModel):
+    omit_none = frozenset({"loc"})
+
     is_async: bool = False
+    # "file.py:line" of the builder call, only set while profiling (see
+    # set_profiling), so the client can attribute render time to source lines
+    loc: str | None = None
 
     @computed_field  # type: ignore[misc]
     @property
     def kind(self) -> str:
         return self.__class__.__name__
 
+    @model_serializer(mode="wrap")
+    def _serialize(
+        self, handler: SerializerFunctionWrapHandler, info: SerializationInfo
+    ) -> Dict[str, Any]:
+        return self._omit_none(handler, info)
+
 
 class If(AST):
     condition: Expr
@@ -35,22 +90,33 @@ class If(AST):
     else_clause: Block | None = None
 
 
+# in async scripts (hooks, handlers) the body runs for up to `concurrency`
+# items at a time, None for all at once. render functions run it in order
 class For(AST):
+    omit_none = AST.omit_none | {"concurrency"}
+
     value: str
     iterable: Expr
     body: Block
+    concurrency: int | None = 1
 
 
 class Map(AST):
+    omit_none = AST.omit_none | {"concurrency"}
+
     value: str
     iterable: Expr
     body: Block
+    concurrency: int | None = None
 
 
 class Filter(AST):
+    omit_none = AST.omit_none | {"concurrency"}
+
     value: str
     iterable: Expr
     body: Block
+    concurrency: int | None = None
 
 
 class Append(AST):
@@ -64,14 +130,18 @@ class Try(AST):
     finally_clause: Block | None
 
 
+# dotted names ("todo.completed") are pre-split into paths by the optimizer
+Path = str | List[str]
+
+
 class Store(AST):
-    name: str
+    name: Path
     scope: Scope
     value: Expr
 
 
 class Load(AST):
-    name: str
+    name: Path
     scope: Scope
 
 
@@ -105,10 +175,52 @@ HTTPMethod = Literal["get", "post", "put", "delete"]
 
 
 class Fetch(AST):
+    # cache options are only sent when set, see FetchCache in client.js
+    omit_none = AST.omit_none | {"ttl", "stale_while_revalidate", "dedupe_key"}
+
     is_async: bool = True
     url: str
     method: HTTPMethod
     headers: Dict[str, str] | None = None
+    # seconds the parsed response is reused for
+    ttl: float | None = None
+    # seconds past the ttl it's still used for while refetched in the background
+    stale_while_revalidate: float | None = None
+    # shares one request (and cache entry) between requests with the same key,
+    # instead of method + url + headers. only GETs are shared without one
+    dedupe_key: str | None = None
+
+
+class Action(AST):
+    # calls an @action method of a component on the server, see Component.actions
+    is_async: bool = True
+    component: str
+    name: str
+    args: Dict[str, Expr] = {}
+
+
+class VirtualList(AST):
+    # a Map over a long list that only renders the rows scrolled into view,
+    # plus overscan rows either side. iterable is a list, or a Page whose
+    # remaining items are loaded with the page action as the end of what's
+    # loaded scrolls into view
+    value: str
+    iterable: Expr
+    body: Block
+    # px, measured from the first row rendered if not given
+    row_height: int | None = None
+    # px, of the scrolling viewport
+    height: int = 400
+    overscan: int = 5
+    # called with offset and limit (plus its own args), returns a Page
+    page: Action | None = None
+    page_size: int = 50
+
+
+class Page(PueModel):
+    # a slice of a long list, for VirtualList
+    items: List[Any]
+    total: int
 
 
 class Sleep(AST):
@@ -171,13 +283,24 @@ class Dictionary(AST):
 PropKey = Tuple[str, ...] | str
 
 
+def is_listener(key: PropKey) -> bool:
+    # onClick, ("onSubmit", "prevent"), etc.
+    name = key[0] if isinstance(key, tuple) else key
+    return len(name) > 2 and name.startswith("on") and name[2].isupper()
+
+
 class VNode(AST):
     # in a vue vnode, the first param is the "type", which can either be a string or a component
     # for pue, this will always be a string, and the frontend will fork based on if the type type is "string" or "component"
+    omit_none = AST.omit_none | {"static"}
+
     v_node_type_type: Literal["string", "component"]
     v_node_type_val: str
     props: Dict[PropKey, Script] = {}
     children: List[Union[VNode, Expr]] = []
+    # set by the optimizer on subtrees with nothing dynamic in them, the slot
+    # the client caches the rendered vnode in so it's built once per instance
+    static: int | None = None
 
 
 Constant = str | int | float | bool | None
@@ -192,8 +315,10 @@ Expr = (
     | Dictionary
     | Constant
     | Fetch
+    | Action
     | VNode
     | Filter
+    | VirtualList
     | Inspect
 )
 Statement = Expr | Log | Panic | Try | Sleep | For | Store | Append | Breakpoint
@@ -201,15 +326,111 @@ Block = Tuple[Statement] | Sequence[Statement] | Statement
 Script = Block
 Template = VNode | Expr
 
+# builders
+
+# how pue.dom/pue.script construct nodes. "validate" checks every node against the
+# Expr/Script unions as it is built, "construct" skips validation entirely so large
+# generated trees cost a plain object allocation per node (use check() to validate later)
+BuilderMode = Literal["validate", "construct"]
+_builder_mode: BuilderMode = (
+    "construct" if os.environ.get("PUE_BUILDER_MODE") == "construct" else "validate"
+)
+A = TypeVar("A", bound=AST)
+_FIELDS: Dict[Type[AST], List[Tuple[str, bool, Any]]] = {}
+
+
+def set_builder_mode(mode: BuilderMode):
+    global _builder_mode
+    _builder_mode = mode
+
+
+# while profiling, nodes are tagged with the source line that built them
+_profiling = os.environ.get("PUE_PROFILE") == "1"
+# with the trailing separator, so a sibling like pue_app/ isn't mistaken for pue
+_PACKAGE_DIR = os.path.dirname(os.path.realpath(__file__)) + os.sep
+_paths: Dict[str, str] = {}
+
+
+def set_profiling(enabled: bool):
+    global _profiling
+    _profiling = enabled
+
+
+def _caller_loc() -> str | None:
+    # first frame outside of pue, i.e. the component's own code
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename.startswith(_PACKAGE_DIR):
+        frame = frame.f_back
+    if frame is None:
+        return None
+    filename = frame.f_code.co_filename
+    path = _paths.get(filename)
+    if path is None:
+        path = _paths[filename] = os.path.relpath(filename)
+    return f"{path}:{frame.f_lineno}"
+
+
+def build(cls: Type[A], **kwargs: Any) -> A:
+    if _profiling:
+        kwargs["loc"] = _caller_loc()
+    if _builder_mode == "validate":
+        return cls(**kwargs)
+    # same as cls.model_construct, minus its per-call field introspection
+    # attrs are filled in field order, pydantic serializes constructed models in dict order
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        fields = _FIELDS[cls] = [
+            (name, field.is_required(), field.default)
+            for name, field in cls.model_fields.items()
+        ]
+    attrs = {}
+    for name, required, default in fields:
+        if name in kwargs:
+            attrs[name] = kwargs[name]
+        elif not required:
+            attrs[name] = (
+                default.copy() if isinstance(default, (list, dict)) else default
+            )
+    node = cls.__new__(cls)
+    object.__setattr__(node, "__dict__", attrs)
+    object.__setattr__(node, "__pydantic_fields_set__", set(kwargs))
+    object.__setattr__(node, "__pydantic_extra__", None)
+    object.__setattr__(node, "__pydantic_private__", None)
+    return node
+
+
+def check(value: Any):
+    # validate a tree built in "construct" mode, raises pydantic.ValidationError
+    # children are checked first, so the error points at the innermost bad node
+    if isinstance(value, AST):
+        for field in value.__class__.model_fields:
+            check(getattr(value, field))
+        value.__class__.model_validate(value.__dict__)
+    elif isinstance(value, dict):
+        for item in value.values():
+            check(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            check(item)
+
+
 # config
 
 
+# when RouterLinks to a route load its components ahead of navigation:
+# when the pointer is over them, or as soon as they're on screen
+Prefetch = Literal["hover", "visible"]
+
+
 class Route(PueModel):
+    omit_none = frozenset({"prefetch"})
+
     path: str
     name: str | None = None
     redirect: str | None = None
     component: Type[Component] | None = Field(exclude=True, default=None)
     children: List[Route] = []
+    prefetch: Prefetch | None = None
 
     # https://docs.pydantic.dev/2.0/usage/computed_fields/
     @computed_field  # type: ignore[misc]
@@ -219,12 +440,46 @@ class Route(PueModel):
             return None
         return self.component.endpoint_path()
 
+    @computed_field  # type: ignore[misc]
+    @property
+    def component_name(self) -> str | None:
+        if not self.component:
+            return None
+        return self.component.name()
+
+    @model_serializer(mode="wrap")
+    def _serialize(
+        self, handler: SerializerFunctionWrapHandler, info: SerializationInfo
+    ) -> Dict[str, Any]:
+        return self._omit_none(handler, info)
+
 
 class RouteConfigResponse(PueModel):
     routes: List[Route]
 
 
-class ComponentEndpointResponse(PueModel):
+# component methods by response field, each one only awaited if a subclass
+# implements it
+HOOKS = (
+    "template",
+    "created",
+    "before_mount",
+    "mounted",
+    "before_update",
+    "updated",
+    "before_unmount",
+    "unmounted",
+    "computed",
+    "watch",
+    "data",
+)
+
+
+class ComponentBundle(PueModel):
+    # everything but the data, content-addressed and cached by the client
+    # hooks a component doesn't implement aren't sent at all
+    omit_none = frozenset((*HOOKS[1:-1], "live"))
+
     template: Template
     created: Script | None = None
     before_mount: Script | None = None
@@ -235,14 +490,156 @@ class ComponentEndpointResponse(PueModel):
     unmounted: Script | None = None
     computed: Dict[str, Script] | None = None
     watch: Dict[str, Script] | None = None
+    # subscribe to live updates while mounted, see pue.live
+    live: bool | None = None
+
+    @model_serializer(mode="wrap")
+    def _serialize(
+        self, handler: SerializerFunctionWrapHandler, info: SerializationInfo
+    ) -> Dict[str, Any]:
+        return self._omit_none(handler, info)
+
+
+class ComponentEndpointResponse(ComponentBundle):
+    # data is always last, see RenderedComponent
     data: Dict[str, Any] = {}
 
 
+class ComponentRef(PueModel):
+    # hash of the component's bundle, plus its data
+    bundle: str
+    data: Dict[str, Any]
+
+
+class ComponentBatchResponse(PueModel):
+    components: Dict[str, ComponentRef]
+    # bundles the client didn't say it already has
+    bundles: Dict[str, ComponentBundle]
+
+
+class ComponentDataResponse(PueModel):
+    data: Dict[str, Dict[str, Any]]
+
+
+class ActionCall(PueModel):
+    component: str
+    action: str
+    args: Dict[str, Any] = {}
+
+
+class ActionBatchRequest(PueModel):
+    calls: List[ActionCall]
+
+
+class ActionResult(PueModel):
+    # one of value or error
+    value: Any = None
+    error: str | None = None
+    status: int | None = None
+
+
+class ActionBatchResponse(PueModel):
+    results: List[ActionResult]
+
+
+class NodeProfile(PueModel):
+    # render/script time of the nodes built on one source line, see set_profiling
+    kind: str
+    loc: str
+    count: int
+    total_ms: float
+    # excluding nodes nested inside it
+    self_ms: float
+
+
+class ProfileReport(PueModel):
+    nodes: List[NodeProfile]
+
+
+class RenderedComponent:
+    # a serialized component response, split into its bundle and its data
+    # so either can be sent on its own
+    __slots__ = ("bundle", "data", "_payload")
+
+    def __init__(self, bundle: Payload, data: bytes):
+        self.bundle = bundle
+        self.data = data
+        self._payload: Payload | None = None
+
+    @classmethod
+    def from_response(
+        cls, res: ComponentEndpointResponse, compact: bool = False
+    ) -> RenderedComponent:
+        fields = {name: getattr(res, name) for name in ComponentBundle.model_fields}
+        bundle = ComponentBundle.model_construct(**fields)
+        if compact:
+            return cls(Payload(encode_compact(bundle)), encode(res.data))
+        return cls(Payload(encode(bundle)), encode(res.data))
+
+    @property
+    def payload(self) -> Payload:
+        # the whole ComponentEndpointResponse, same bytes as encode(res) unless
+        # the bundle is compact
+        if self._payload is None:
+            self._payload = Payload(
+                self.bundle.body[:-1] + b',"data":' + self.data + b"}"
+            )
+        return self._payload
+
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def action(fn: F) -> F:
+    # marks an async component method as callable from scripts with
+    # s.action(self.method, arg=...). arguments are validated against the
+    # method's annotations, and it gets the request if it takes a `req` argument
+    fn.__pue_action__ = True  # type: ignore[attr-defined]
+    return fn
+
+
 class Component(ABC):
+    # opt-in cache of serialized responses, shared by requests with the same cache_key
+    render_cache: ClassVar[RenderCache | None] = None
+    # run the ast optimizer over responses before they are serialized, see pue.optimizer
+    optimize: ClassVar[bool] = True
+    # send the bundle in the compact format, repeated strings and subtrees
+    # only once, see pue.compact. costs more to serialize than it saves for
+    # small templates, pair it with render_cache for big generated ones
+    compact: ClassVar[bool] = False
+    # always rendered live, never exported by pue.static
+    dynamic: ClassVar[bool] = False
+    # push template/data changes to clients showing this component, see pue.live
+    live: ClassVar[bool] = False
+    # also re-render and push changes every this many seconds while subscribed
+    live_interval: ClassVar[float | None] = None
+    # HOOKS this class actually implements, worked out once per subclass
+    implemented_hooks: ClassVar[Tuple[str, ...]] = ()
+    # @action methods by name, with their arguments validated against their annotations
+    actions: ClassVar[Dict[str, Callable[..., Awaitable[Any]]]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls.implemented_hooks = tuple(
+            hook
+            for hook in HOOKS
+            if getattr(cls, f"async_{hook}") is not getattr(Component, f"async_{hook}")
+        )
+        cls.actions = {
+            name: validate_call(fn, config={"arbitrary_types_allowed": True})
+            for name, fn in inspect.getmembers(cls, inspect.iscoroutinefunction)
+            if getattr(fn, "__pue_action__", False)
+        }
+
     @classmethod
     def name(cls) -> str:
         return cls.__name__
 
+    @classmethod
+    def cache_key(cls, req: Request) -> Hashable | None:
+        # requests that return None bypass the render cache
+        return ()
+
     @classmethod
     def endpoint_path(cls) -> str:
         return f"components/{cls.name()}"
@@ -264,41 +661,116 @@ class Component(ABC):
     @classmethod
     async def async_endpoint(cls, req: Request) -> ComponentEndpointResponse:
         instance = cls()
-        (
-            template,
-            mounted,
-            created,
-            before_mount,
-            before_update,
-            updated,
-            before_unmount,
-            unmounted,
-            data,
-            computed,
-            watch,
-        ) = await asyncio.gather(
-            instance.async_template(req=req),
-            instance.async_mounted(),
-            instance.async_created(),
-            instance.async_before_mount(),
-            instance.async_before_update(),
-            instance.async_updated(),
-            instance.async_before_unmount(),
-            instance.async_unmounted(),
-            instance.async_data(),
-            instance.async_computed(),
-            instance.async_watch(),
-        )
-        return ComponentEndpointResponse(
-            template=cast(Template, template),
-            mounted=cast(Script, mounted),
-            created=cast(Script, created),
-            before_mount=cast(Script, before_mount),
-            before_update=cast(Script, before_update),
-            updated=cast(Script, updated),
-            before_unmount=cast(Script, before_unmount),
-            unmounted=cast(Script, unmounted),
-            data=cast(Dict[str, Any], data),
-            computed=cast(Union[Dict[str, Script], None], computed),
-            watch=cast(Union[Dict[str, Script], None], watch),
-        )
+        name = cls.name()
+        hooks = cls.implemented_hooks
+        calls = [
+            instance.async_template(req=req)
+            if hook == "template"
+            else getattr(instance, f"async_{hook}")()
+            for hook in hooks
+        ]
+        # hooks share the request's data loaders and metrics, see pue.dataloader
+        with bind(req):
+            # most components only implement the template, skip the gather for those
+            if len(calls) == 1:
+                with timed(
+                    "pue_hook_seconds",
+                    f"{name}.{hooks[0]}",
+                    component=name,
+                    hook=hooks[0],
+                ):
+                    results = [await calls[0]]
+            else:
+                results = await asyncio.gather(
+                    *[
+                        timed_call(
+                            call,
+                            "pue_hook_seconds",
+                            f"{name}.{hook}",
+                            component=name,
+                            hook=hook,
+                        )
+                        for hook, call in zip(hooks, calls)
+                    ]
+                )
+            with timed("pue_validate_seconds", f"{name}.validate", component=name):
+                res = ComponentEndpointResponse(
+                    **{hook: result for hook, result in zip(hooks, results)},
+                    live=cls.live or None,
+                )
+            if cls.optimize:
+                from .optimizer import optimize_response
+
+                with timed("pue_optimize_seconds", f"{name}.optimize", component=name):
+                    res = optimize_response(res)
+        return res
+
+    @classmethod
+    async def async_rendered(cls, req: Request) -> RenderedComponent:
+        cache = cls.render_cache
+        key = cls.cache_key(req) if cache is not None else None
+        name = cls.name()
+        if cache is not None and key is not None:
+            rendered = cache.get((cls, key))
+            if rendered is not None:
+                with bind(req):
+                    observe("pue_render_cache_hits_total", 1, component=name)
+                return rendered
+        res = await cls.async_endpoint(req)
+        with bind(req):
+            with timed("pue_serialize_seconds", f"{name}.serialize", component=name):
+                rendered = RenderedComponent.from_response(res, cls.compact)
+            observe(
+                "pue_payload_bytes",
+                len(rendered.bundle.body),
+                component=name,
+                part="bundle",
+            )
+            observe(
+                "pue_payload_bytes", len(rendered.data), component=name, part="data"
+            )
+        if cache is not None and key is not None:
+            cache.set((cls, key), rendered)
+        return rendered
+
+    @classmethod
+    async def async_payload(cls, req: Request) -> Payload:
+        return (await cls.async_rendered(req)).payload
+
+    @classmethod
+    async def async_data_payload(cls, req: Request) -> bytes:
+        # just the data, for clients that already have the bundle
+        if "data" not in cls.implemented_hooks:
+            return b"{}"
+        name = cls.name()
+        with bind(req):
+            with timed("pue_hook_seconds", f"{name}.data", component=name, hook="data"):
+                data = await cls().async_data()
+            with timed("pue_serialize_seconds", f"{name}.serialize", component=name):
+                body = encode(data)
+            observe("pue_payload_bytes", len(body), component=name, part="data")
+        return body
+
+    @classmethod
+    async def async_call(cls, req: Request, name: str, args: Dict[str, Any]) -> Any:
+        action = cls.actions.get(name)
+        if action is None:
+            raise HTTPException(
+                status_code=404, detail=f"unknown action: {cls.name()}.{name}"
+            )
+        if "req" in inspect.signature(action).parameters:
+            args = {**args, "req": req}
+        with bind(req):
+            return await action(cls(), **args)
+
+    @classmethod
+    async def async_push(cls):
+        # re-render for every client subscribed to live updates, and send them
+        # whatever changed
+        from .live import push
+
+        await push(cls)
+
+    @classmethod
+    async def async_response(cls, req: Request) -> Response:
+        return (await cls.async_payload(req)).response(req)
@@ -0,0 +1,262 @@
+from __future__ import annotations
+from itertools import count
+from typing import Any, Dict, Iterator, Tuple
+from . import models as m
+from .render import js_type, truthy
+
+# ast optimization pass, run once over a component endpoint response before it
+# is serialized, to shrink the payload and the work the client does per render
+# - folds BinOp/Compare/BoolOp/UnaryOp over constants, only where python and js agree
+# - drops If branches that can never be taken
+# - flattens nested blocks in statement position (hooks, watchers, event handlers),
+#   where the value of the block is never used
+# - pre-splits dotted Load/Store names into paths so the client doesn't split them
+#   on every evaluation
+# - numbers fully static VNode subtrees in the template (VNode.static), so the
+#   client builds them once per instance and vue can skip diffing them
+# nodes are never mutated, changed subtrees are copied
+
+# fields holding blocks that inherit the statement/expression position of their node
+_BLOCK_FIELDS = {
+    "then_clause",
+    "else_clause",
+    "try_clause",
+    "catch_clause",
+    "finally_clause",
+}
+
+_HOOKS = (
+    "created",
+    "before_mount",
+    "mounted",
+    "before_update",
+    "updated",
+    "before_unmount",
+    "unmounted",
+)
+
+# integers past this lose precision as js numbers, leave them alone
+_MAX_SAFE_INTEGER = 2**53 - 1
+
+_CONSTANT = (str, int, float, bool)
+
+
+class _NotFolded:
+    pass
+
+
+_NOT_FOLDED = _NotFolded()
+
+
+def optimize_response(res: m.ComponentEndpointResponse) -> m.ComponentEndpointResponse:
+    updates: Dict[str, Any] = {"template": hoist(optimize(res.template))}
+    for hook in _HOOKS:
+        updates[hook] = optimize(getattr(res, hook), statement=True)
+    if res.computed is not None:
+        updates["computed"] = {k: optimize(v) for k, v in res.computed.items()}
+    if res.watch is not None:
+        updates["watch"] = {
+            k: optimize(v, statement=True) for k, v in res.watch.items()
+        }
+    return res.model_copy(update=updates)
+
+
+def optimize(value: Any, statement: bool = False) -> Any:
+    if isinstance(value, (list, tuple)):
+        items = [optimize(item, statement) for item in value]
+        if statement:
+            items = _flatten(items)
+            if len(items) == 1:
+                return items[0]
+        if all(a is b for a, b in zip(items, value)) and len(items) == len(value):
+            return value
+        return items
+    if not isinstance(value, m.AST):
+        return value
+    if isinstance(value, m.VNode):
+        return _optimize_vnode(value)
+    updates: Dict[str, Any] = {}
+    for name in value.__class__.model_fields:
+        field = getattr(value, name)
+        if isinstance(field, (m.AST, list, tuple)):
+            field_statement = (statement and name in _BLOCK_FIELDS) or (
+                isinstance(value, m.For) and name == "body"
+            )
+            optimized = optimize(field, field_statement)
+        elif isinstance(field, dict):
+            optimized = _optimize_values(field)
+        else:
+            continue
+        if optimized is not field:
+            updates[name] = optimized
+    node = value.model_copy(update=updates) if updates else value
+    return _fold(node)
+
+
+def _optimize_vnode(node: m.VNode) -> m.VNode:
+    props = {
+        key: optimize(value, statement=m.is_listener(key))
+        for key, value in node.props.items()
+    }
+    children = [optimize(child) for child in node.children]
+    if all(props[k] is v for k, v in node.props.items()) and all(
+        a is b for a, b in zip(children, node.children)
+    ):
+        return node
+    return node.model_copy(update={"props": props, "children": children})
+
+
+def hoist(template: Any) -> Any:
+    # only nodes rendered at most once per render are hoisted: the client
+    # reuses the same vnode, and vue can't mount one vnode in two places.
+    # so nothing in Map/Filter/VirtualList bodies or in component slots
+    slots = count()
+    node, static = _hoist(template, slots)
+    return _number(node, slots) if static else node
+
+
+def _hoist(value: Any, slots: Iterator[int]) -> Tuple[Any, bool]:
+    # (value with its largest static subtrees numbered, whether it's static
+    # itself). static subtrees are left for the parent to number, so only the
+    # outermost node of one gets a slot
+    if isinstance(value, m.VNode):
+        if value.v_node_type_type == "component":
+            return value, False
+        static = True
+        for key, prop in value.props.items():
+            constant = prop is None or isinstance(prop, _CONSTANT)
+            if not constant or m.is_listener(key) or key == "ref":
+                static = False
+                break
+        results = [_hoist(child, slots) for child in value.children]
+        if static and all(child_static for _, child_static in results):
+            return value, True
+        children = []
+        changed = False
+        for original, (child, child_static) in zip(value.children, results):
+            if child_static:
+                child = _number(child, slots)
+            changed = changed or child is not original
+            children.append(child)
+        if not changed:
+            return value, False
+        return value.model_copy(update={"children": children}), False
+    if isinstance(value, m.If):
+        then_clause = _hoist_branch(value.then_clause, slots)
+        else_clause = _hoist_branch(value.else_clause, slots)
+        if then_clause is value.then_clause and else_clause is value.else_clause:
+            return value, False
+        update = {"then_clause": then_clause, "else_clause": else_clause}
+        return value.model_copy(update=update), False
+    return value, value is None or isinstance(value, _CONSTANT)
+
+
+def _hoist_branch(value: Any, slots: Iterator[int]) -> Any:
+    node, static = _hoist(value, slots)
+    return _number(node, slots) if static else node
+
+
+def _number(value: Any, slots: Iterator[int]) -> Any:
+    # constants are static too, but there's nothing to cache
+    if isinstance(value, m.VNode):
+        return value.model_copy(update={"static": next(slots)})
+    return value
+
+
+def _optimize_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    optimized = {key: optimize(value) for key, value in values.items()}
+    if all(optimized[k] is v for k, v in values.items()):
+        return values
+    return optimized
+
+
+def _fold(node: m.AST) -> Any:
+    if isinstance(node, m.If) and _is_constant(node.condition):
+        return node.then_clause if truthy(node.condition) else node.else_clause
+    if isinstance(node, m.Load) and isinstance(node.name, str) and "." in node.name:
+        return node.model_copy(update={"name": node.name.split(".")})
+    if (
+        isinstance(node, m.Store)
+        and node.scope == "local"
+        and isinstance(node.name, str)
+        and "." in node.name
+    ):
+        # component stores set the full dotted name as one key, leave those as is
+        return node.model_copy(update={"name": node.name.split(".")})
+    folded: Any = _NOT_FOLDED
+    if isinstance(node, m.BinOp) and _is_constant(node.left, node.right):
+        folded = _fold_binop(node.op, node.left, node.right)
+    elif isinstance(node, m.Compare) and _is_constant(node.left, node.right):
+        folded = _fold_compare(node.op, node.left, node.right)
+    elif isinstance(node, m.BoolOp) and _is_constant(node.left, node.right):
+        # both sides are always evaluated on the client, so only fold when both are constant
+        if node.op == "and":
+            folded = node.right if truthy(node.left) else node.left
+        else:
+            folded = node.left if truthy(node.left) else node.right
+    elif isinstance(node, m.UnaryOp) and _is_constant(node.expr):
+        if node.op == "not":
+            folded = not truthy(node.expr)
+        elif _is_number(node.expr):
+            # client.js negates for invert too
+            folded = node.expr if node.op == "uadd" else -node.expr
+    if folded is _NOT_FOLDED:
+        return node
+    if isinstance(folded, int) and abs(folded) > _MAX_SAFE_INTEGER:
+        return node
+    return folded
+
+
+def _fold_binop(op: m.BinOpType, left: Any, right: Any) -> Any:
+    if isinstance(left, str) and isinstance(right, str) and op == "add":
+        return left + right
+    if not (_is_number(left) and _is_number(right)):
+        return _NOT_FOLDED
+    if op == "add":
+        return left + right
+    if op == "sub":
+        return left - right
+    if op == "mul":
+        return left * right
+    if op == "div" and right != 0:
+        return left / right
+    # mod/floordiv/shifts etc. round and wrap differently in js
+    return _NOT_FOLDED
+
+
+def _fold_compare(op: m.CompareType, left: Any, right: Any) -> Any:
+    if op in ("eq", "neq"):
+        # ===, so values of different js types are never equal
+        same = js_type(left) == js_type(right) and left == right
+        return same if op == "eq" else not same
+    if op in ("in", "nin") and isinstance(left, str) and isinstance(right, str):
+        return (left in right) if op == "in" else (left not in right)
+    if not (_is_number(left) and _is_number(right)):
+        return _NOT_FOLDED
+    if op == "lt":
+        return left < right
+    if op == "lte":
+        return left <= right
+    if op == "gt":
+        return left > right
+    if op == "gte":
+        return left >= right
+    return _NOT_FOLDED
+
+
+def _flatten(items: list) -> list:
+    flat = []
+    for item in items:
+        if isinstance(item, (list, tuple)):
+            flat.extend(_flatten(list(item)))
+        elif item is not None:
+            flat.append(item)
+    return flat
+
+
+def _is_constant(*values: Any) -> bool:
+    return all(value is None or isinstance(value, _CONSTANT) for value in values)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import mmap
+from typing import Dict, Sequence
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# a serialized response body plus everything needed to serve it efficiently:
+# a content-hash etag for If-None-Match revalidation (suffixed per encoding, so
+# each variant's bytes have their own strong validator), and gzip/brotli variants
+# that are compressed on first use and then kept alongside the body (so cached
+# payloads and static assets are only ever compressed once)
+
+# not worth compressing below this many bytes
+MIN_COMPRESS_SIZE = 512
+NO_CACHE = "no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+# file suffixes for precompressed variants on disk, see pue.static
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# supported encodings, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class Payload:
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self.hash = hashlib.sha256(body).hexdigest()[:20]
+        self.etag = f'"{self.hash}"'
+        self._variants: Dict[str, bytes] = {}
+
+    def compressed(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            if encoding == "br" and brotli is not None:
+                variant = brotli.compress(self.body)
+            elif encoding == "gzip":
+                # fixed mtime so the bytes (and any downstream etags) are stable
+                variant = gzip.compress(self.body, compresslevel=6, mtime=0)
+            else:
+                raise ValueError(f"unsupported encoding: {encoding}")
+            self._variants[encoding] = variant
+        return variant
+
+    def response(self, req: Request, cache_control: str = NO_CACHE) -> Response:
+        encoding = self._negotiate(req.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": _etag(self.etag, encoding),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if _matches(req.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(
+            self.compressed(encoding), media_type=self.media_type, headers=headers
+        )
+
+    def _negotiate(self, accept_encoding: str) -> str | None:
+        if len(self.body) < MIN_COMPRESS_SIZE:
+            return None
+        return _negotiate(accept_encoding, ENCODINGS)
+
+
+class StaticFile:
+    # a payload exported to disk by pue.static, along with whichever precompressed
+    # variants were written next to it. served with sendfile where the server
+    # supports it, the body is only read (memory-mapped) when it has to be inlined
+    def __init__(
+        self,
+        path: str,
+        etag: str,
+        media_type: str = "application/json",
+        encodings: Sequence[str] = (),
+        bundle: str | None = None,
+    ):
+        self.path = path
+        self.etag = etag
+        self.media_type = media_type
+        self.encodings = tuple(encodings)
+        # for component payloads, the hash of their exported bundle
+        self.bundle = bundle
+        self._body: mmap.mmap | None = None
+
+    @property
+    def body(self) -> memoryview:
+        if self._body is None:
+            with open(self.path, "rb") as f:
+                self._body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._body)
+
+    def response(self, req: Request, cache_control: str = NO_CACHE) -> Response:
+        encoding = _negotiate(req.headers.get("accept-encoding", ""), self.encodings)
+        headers = {
+            "ETag": _etag(self.etag, encoding),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if _matches(req.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        path = self.path
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            path += SUFFIXES[encoding]
+        return FileResponse(path, media_type=self.media_type, headers=headers)
+
+
+def _negotiate(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        if _qvalue(params) > 0:
+            accepted.add(name.strip().lower())
+    for encoding in encodings:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def _qvalue(params: Sequence[str]) -> float:
+    # gzip;q=0, gzip; q=0.000 etc mean not acceptable, a malformed q too
+    for param in params:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0
+    return 1
+
+
+def _etag(etag: str, encoding: str | None) -> str:
+    # each encoding's bytes get their own strong validator, "<hash>-gz" etc
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{SUFFIXES[encoding][1:]}"'
+
+
+def _strip_encoding(tag: str) -> str:
+    for suffix in SUFFIXES.values():
+        marker = f'-{suffix[1:]}"'
+        if tag.endswith(marker):
+            return tag[: -len(marker)] + '"'
+    return tag
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    # any variant's tag revalidates, the content behind them is the same
+    if not if_none_match:
+        return False
+    candidates = [
+        _strip_encoding(tag.strip().removeprefix("W/"))
+        for tag in if_none_match.split(",")
+    ]
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,423 @@
+from __future__ import annotations
+import math
+from html import escape
+from typing import Any, Callable, Dict, Iterator, List, Mapping
+from . import models as m
+
+# server-side rendering of pue templates to static html for first paint
+# evaluates templates against a component's data/computed the same way the sync
+# interpreter in client.js does (js truthiness, `.length`, etc), and yields html
+# in chunks so large pages start flushing before the whole tree is rendered.
+# the client app mounts over the result once vue-router has resolved the route
+
+# flush to the caller once this many characters are buffered
+CHUNK_SIZE = 16 * 1024
+
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+# VirtualList rows are assumed to be this tall (px) until the client measures one
+ESTIMATED_ROW_HEIGHT = 32
+
+# renders whatever the next matched route's component is, for RouterView
+Outlet = Callable[[], Iterator[str]]
+
+
+class RenderError(Exception):
+    pass
+
+
+class ComponentState(Mapping[str, Any]):
+    # what `this` resolves to in a template: data, plus computed evaluated on demand
+    def __init__(self, data: Dict[str, Any], computed: Dict[str, m.Script] | None):
+        self._data = data
+        self._computed = computed or {}
+        self._resolved: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._data:
+            return self._data[key]
+        if key not in self._resolved:
+            if key not in self._computed:
+                raise KeyError(key)
+            self._resolved[key] = evaluate(self._computed[key], Scope(self))
+        return self._resolved[key]
+
+    def __iter__(self):
+        yield from self._data
+        yield from self._computed
+
+    def __len__(self):
+        return len(self._data) + len(self._computed)
+
+
+class Scope:
+    # template evaluation state, like Scope in client.js
+    def __init__(
+        self, component: Mapping[str, Any], locals: Dict[str, Any] | None = None
+    ):
+        self.component = component
+        self.locals = {} if locals is None else locals
+
+    def child(self, name: str, value: Any) -> Scope:
+        return Scope(self.component, {**self.locals, name: value})
+
+
+class BoundVNode:
+    # a vnode together with the scope its props/children are evaluated in
+    # children can also be given already evaluated
+    __slots__ = ("node", "scope", "evaluated")
+
+    def __init__(self, node: m.VNode, scope: Scope, evaluated: List[Any] | None = None):
+        self.node = node
+        self.scope = scope
+        self.evaluated = evaluated
+
+
+def render_response(
+    res: m.ComponentEndpointResponse, outlet: Outlet | None = None, path: str = "/"
+) -> Iterator[str]:
+    state = ComponentState(res.data, res.computed)
+    return render(res.template, Scope(state), outlet=outlet, path=path)
+
+
+def render(
+    template: m.Template, scope: Scope, outlet: Outlet | None = None, path: str = "/"
+) -> Iterator[str]:
+    buf: List[str] = []
+    size = 0
+    try:
+        for chunk in _Renderer(outlet, path).node(evaluate(template, scope), buf):
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                yield "".join(buf)
+                buf.clear()
+                size = 0
+    except RenderError:
+        raise
+    except Exception as e:
+        # data the template doesn't expect (a map over null, arithmetic on a
+        # missing key) fails the same as anything else the server can't render
+        raise RenderError(f"{type(e).__name__}: {e}") from e
+    if buf:
+        yield "".join(buf)
+
+
+class _Renderer:
+    # walks evaluated template values, appending html to buf
+    # and yielding each appended piece so render can decide when to flush
+    def __init__(self, outlet: Outlet | None, path: str):
+        self.outlet = outlet
+        self.path = path
+
+    def node(self, value: Any, buf: List[str]) -> Iterator[str]:
+        if isinstance(value, BoundVNode):
+            yield from self.vnode(value.node, value.scope, buf, value.evaluated)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                yield from self.node(item, buf)
+        elif value is None or isinstance(value, (bool, dict)):
+            # vue renders nothing for null/booleans
+            return
+        else:
+            text = escape(_js_str(value), quote=False)
+            buf.append(text)
+            yield text
+
+    def vnode(
+        self,
+        node: m.VNode,
+        scope: Scope,
+        buf: List[str],
+        evaluated: List[Any] | None = None,
+    ) -> Iterator[str]:
+        props = {
+            key: evaluate(value, scope)
+            for key, value in node.props.items()
+            # event handlers only exist client side
+            if not m.is_listener(key)
+        }
+        tag = node.v_node_type_val
+        if node.v_node_type_type == "component":
+            if tag == "RouterView":
+                if self.outlet:
+                    for chunk in self.outlet():
+                        buf.append(chunk)
+                        yield chunk
+                return
+            if tag == "RouterLink":
+                to = props.pop("to", None)
+                classes = [props.pop("class", None)]
+                if to == self.path:
+                    classes.append(props.get("exactActiveClass"))
+                props = {"href": to, "class": classes}
+                tag = "a"
+            else:
+                # unknown component, only its children are known server side
+                yield from self.children(node, scope, buf)
+                return
+        attrs = "".join(_attr(key, value) for key, value in props.items())
+        open_tag = f"<{tag}{attrs}>"
+        buf.append(open_tag)
+        yield open_tag
+        if tag in VOID_ELEMENTS:
+            return
+        if evaluated is not None:
+            yield from self.node(evaluated, buf)
+        else:
+            yield from self.children(node, scope, buf)
+        close_tag = f"</{tag}>"
+        buf.append(close_tag)
+        yield close_tag
+
+    def children(self, node: m.VNode, scope: Scope, buf: List[str]) -> Iterator[str]:
+        for child in node.children:
+            yield from self.node(evaluate(child, scope), buf)
+
+
+def evaluate(ast: Any, scope: Scope) -> Any:
+    # mirrors interpret() in client.js. vnodes are bound to the current scope,
+    # their props/children are evaluated as the renderer reaches them
+    if ast is None or isinstance(ast, (str, int, float, bool)):
+        return ast
+    if isinstance(ast, m.VNode):
+        return BoundVNode(ast, scope)
+    if isinstance(ast, (list, tuple)):
+        return [evaluate(item, scope) for item in ast]
+    if ast.is_async:
+        raise RenderError(f"async not supported in render function ({ast.kind})")
+    if isinstance(ast, m.Load):
+        return _load(ast, scope)
+    if isinstance(ast, m.If):
+        if truthy(evaluate(ast.condition, scope)):
+            return evaluate(ast.then_clause, scope)
+        return evaluate(ast.else_clause, scope)
+    if isinstance(ast, m.Map):
+        return [
+            evaluate(ast.body, scope.child(ast.value, item))
+            for item in evaluate(ast.iterable, scope)
+        ]
+    if isinstance(ast, m.VirtualList):
+        return _virtual_list(ast, scope)
+    if isinstance(ast, m.Filter):
+        return [
+            item
+            for item in evaluate(ast.iterable, scope)
+            if truthy(evaluate(ast.body, scope.child(ast.value, item)))
+        ]
+    if isinstance(ast, m.Compare):
+        return _compare(ast.op, evaluate(ast.left, scope), evaluate(ast.right, scope))
+    if isinstance(ast, m.BinOp):
+        return _binop(ast.op, evaluate(ast.left, scope), evaluate(ast.right, scope))
+    if isinstance(ast, m.BoolOp):
+        left = evaluate(ast.left, scope)
+        right = evaluate(ast.right, scope)
+        if ast.op == "and":
+            return right if truthy(left) else left
+        return left if truthy(left) else right
+    if isinstance(ast, m.UnaryOp):
+        value = evaluate(ast.expr, scope)
+        if ast.op == "not":
+            return not truthy(value)
+        if ast.op == "uadd":
+            return value
+        # client.js treats invert as negation too
+        return -value
+    if isinstance(ast, m.Dictionary):
+        return {key: evaluate(value, scope) for key, value in ast.value.items()}
+    if isinstance(ast, (m.Log, m.Inspect, m.Breakpoint)):
+        return None
+    if isinstance(ast, m.Panic):
+        raise RenderError(ast.msg)
+    # Store/Append/Try etc. mutate state, leave them to the client
+    raise RenderError(f"unsupported node in server render: {ast.kind}")
+
+
+def _virtual_list(ast: m.VirtualList, scope: Scope) -> BoundVNode:
+    # the first window, laid out like VirtualListView in client.js
+    source = evaluate(ast.iterable, scope)
+    if isinstance(source, (list, tuple)):
+        items, total = source, len(source)
+    else:
+        items, total = _get(source, "items") or [], _get(source, "total") or 0
+    row_height = ast.row_height or ESTIMATED_ROW_HEIGHT
+    end = min(len(items), -(-ast.height // row_height) + ast.overscan)
+    rows = [evaluate(ast.body, scope.child(ast.value, item)) for item in items[:end]]
+    spacer = _div(f"height:{total * row_height}px;box-sizing:border-box")
+    viewport = _div(f"height:{ast.height}px;overflow-y:auto")
+    return BoundVNode(viewport, scope, [BoundVNode(spacer, scope, rows)])
+
+
+def _div(style: str) -> m.VNode:
+    return m.build(
+        m.VNode,
+        v_node_type_type="string",
+        v_node_type_val="div",
+        props={"style": style},
+    )
+
+
+def _load(ast: m.Load, scope: Scope) -> Any:
+    head, *rest = ast.name if isinstance(ast.name, list) else ast.name.split(".")
+    if ast.scope == "local":
+        value = scope.locals.get(head)
+    else:
+        value = scope.component.get(head)
+    for part in rest:
+        value = _get(value, part)
+    return value
+
+
+def _get(value: Any, key: str) -> Any:
+    # property access with js semantics, missing keys are undefined (None)
+    if isinstance(value, (list, str)):
+        if key == "length":
+            return len(value)
+        return value[int(key)] if key.isdigit() and int(key) < len(value) else None
+    if isinstance(value, Mapping):
+        return value.get(key)
+    return getattr(value, key, None)
+
+
+def truthy(value: Any) -> bool:
+    # js truthiness, empty lists and objects are truthy. also what the optimizer
+    # folds constant conditions with
+    if isinstance(value, (list, tuple, dict)):
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    return bool(value)
+
+
+def js_type(value: Any) -> str:
+    # === compares numbers by value whether they are int or float in python.
+    # also what the optimizer folds constant comparisons with
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "number"
+    return type(value).__name__
+
+
+def _compare(op: m.CompareType, left: Any, right: Any) -> bool:
+    if op == "eq":
+        return js_type(left) == js_type(right) and left == right
+    if op == "neq":
+        return not (js_type(left) == js_type(right) and left == right)
+    if op == "in":
+        return left in right
+    if op == "nin":
+        return left not in right
+    try:
+        if op == "lt":
+            return left < right
+        if op == "lte":
+            return left <= right
+        if op == "gt":
+            return left > right
+        return left >= right
+    except TypeError:
+        # mismatched types compare false in js (mostly)
+        return False
+
+
+def _binop(op: m.BinOpType, left: Any, right: Any) -> Any:
+    if op == "add":
+        if isinstance(left, str) or isinstance(right, str):
+            return _js_str(left) + _js_str(right)
+        return left + right
+    if op == "sub":
+        return left - right
+    if op == "mul":
+        return left * right
+    if op == "div":
+        return _js_div(left, right)
+    if op == "mod":
+        return _js_mod(left, right)
+    if op == "pow":
+        return left**right
+    if op == "floordiv":
+        return left // right if right else _js_div(left, right)
+    if op == "lshift":
+        return left << right
+    if op == "rshift":
+        return left >> right
+    if op == "bitand":
+        return left & right
+    if op == "bitor":
+        return left | right
+    return left ^ right
+
+
+def _js_div(left: Any, right: Any) -> Any:
+    # js gives Infinity/NaN instead of raising
+    if right == 0:
+        if left == 0 or math.isnan(left):
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1, right)
+    return left / right
+
+
+def _js_mod(left: Any, right: Any) -> Any:
+    # js % takes the sign of the dividend, python's the divisor's
+    if right == 0:
+        return math.nan
+    value = left % right
+    if value and (value < 0) != (left < 0):
+        value -= right
+    return value
+
+
+def _js_str(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+    return str(value)
+
+
+def _attr(key: m.PropKey, value: Any) -> str:
+    if isinstance(key, tuple) or key in ("key", "ref") or key[0].isupper():
+        return ""
+    if key == "class":
+        value = _normalize_class(value)
+        if not value:
+            return ""
+    elif key == "style" and isinstance(value, dict):
+        value = ";".join(f"{k}:{_js_str(v)}" for k, v in value.items() if v is not None)
+    if value is None or value is False:
+        return ""
+    if value is True:
+        return f" {key}"
+    if isinstance(value, (list, dict)):
+        return ""
+    return f' {key}="{escape(_js_str(value))}"'
+
+
+def _normalize_class(value: Any) -> str:
+    # same rules as vue's normalizeClass
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return " ".join(filter(None, (_normalize_class(item) for item in value)))
+    if isinstance(value, dict):
+        return " ".join(key for key, enabled in value.items() if truthy(enabled))
+    return ""
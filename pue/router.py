@@ -0,0 +1,85 @@
+from __future__ import annotations
+from typing import List, Tuple
+from . import models as m
+
+# server-side mirror of vue-router's matching for pue route configs, so the server
+# knows which components a url will render before the client asks for them
+# supports static segments, :params, catch-all params (/:pathMatch(.*)*),
+# nested/relative child paths and string redirects. like vue-router, the most
+# specific match wins whatever the declaration order: static segments over
+# params over catch-alls, earlier routes on a tie
+
+MAX_REDIRECTS = 10
+
+
+def resolve(routes: List[m.Route], path: str) -> List[m.Route]:
+    # matched route chain for path, outermost first. empty if nothing matches
+    for _ in range(MAX_REDIRECTS):
+        matched = _match(routes, "/", _segments(path))
+        if not matched:
+            return []
+        leaf, _ = matched[-1]
+        if not leaf.redirect:
+            return [route for route, _ in matched]
+        parent_path = matched[-2][1] if len(matched) > 1 else "/"
+        path = _join(parent_path, leaf.redirect)
+    return []
+
+
+def _match(
+    routes: List[m.Route], parent_path: str, segments: List[str]
+) -> List[Tuple[m.Route, str]]:
+    best: List[Tuple[m.Route, str]] = []
+    best_score: List[int] = []
+    for route in routes:
+        full_path = _join(parent_path, route.path)
+        route_segments = _segments(full_path)
+        if not _matches(route_segments, segments, prefix=True):
+            continue
+        children = _match(route.children, full_path, segments)
+        if children:
+            matched = [(route, full_path), *children]
+        elif _matches(route_segments, segments):
+            matched = [(route, full_path)]
+        else:
+            continue
+        # "/" counts as a static segment, like in vue-router
+        score = [_score(segment) for segment in _segments(matched[-1][1])] or [2]
+        if not best or score > best_score:
+            best, best_score = matched, score
+    return best
+
+
+def _matches(
+    route_segments: List[str], segments: List[str], prefix: bool = False
+) -> bool:
+    # whether the route matches all of segments, or just their start
+    for i, expected in enumerate(route_segments):
+        if _is_catch_all(expected):
+            return True
+        if i == len(segments):
+            return False
+        if not expected.startswith(":") and expected != segments[i]:
+            return False
+    return prefix or len(route_segments) == len(segments)
+
+
+def _is_catch_all(segment: str) -> bool:
+    # /:pathMatch(.*)* or /:pathMatch(.*), matches the rest of the path
+    return segment.startswith(":") and "(.*)" in segment
+
+
+def _score(segment: str) -> int:
+    if _is_catch_all(segment):
+        return 0
+    return 1 if segment.startswith(":") else 2
+
+
+def _join(parent_path: str, path: str) -> str:
+    if path.startswith("/"):
+        return path
+    return parent_path.rstrip("/") + "/" + path
+
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.split("?")[0].split("/") if segment]
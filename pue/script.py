@@ -1,23 +1,23 @@
 from __future__ import annotations
-from typing import Dict
+from typing import Any, Callable, Dict
 from . import models as m
 
 
 def sleep(ms: int):
-    return m.Sleep(ms=ms)
+    return m.build(m.Sleep, ms=ms)
 
 
 def inspect():
-    return m.Inspect()
+    return m.build(m.Inspect)
 
 
 def breakpoint():
-    return m.Breakpoint()
+    return m.build(m.Breakpoint)
 
 
 def log_level(level: m.LogLevel):
     def inner(value: m.Expr):
-        return m.Log(value=value, level=level)
+        return m.build(m.Log, value=value, level=level)
 
     return inner
 
@@ -30,16 +30,16 @@ error = log_level("error")
 
 
 def append(iterable: m.Expr, value: m.Expr):
-    return m.Append(iterable=iterable, value=value)
+    return m.build(m.Append, iterable=iterable, value=value)
 
 
 def scope_proxy(scope: m.Scope):
     class Proxy:
         def get(self, name: str):
-            return m.Load(name=name, scope=scope)
+            return m.build(m.Load, name=name, scope=scope)
 
         def set_(self, name: str, value: m.Expr):
-            return m.Store(name=name, scope=scope, value=value)
+            return m.build(m.Store, name=name, scope=scope, value=value)
 
     return Proxy()
 
@@ -49,31 +49,99 @@ local = scope_proxy("local")
 
 
 def obj(value: Dict[str, m.Expr] = {}):
-    return m.Dictionary(value=value)
+    return m.build(m.Dictionary, value=value)
 
 
-def filter(iterable: m.Expr, value: str, body: m.Expr):
-    return m.Filter(value=value, iterable=iterable, body=body)
+# concurrency caps how many items an async body (e.g. s.fetch per item in a
+# hook) runs for at once, None for all at once
 
 
-def map(iterable: m.Expr, value: str, body: m.Expr):
-    return m.Map(value=value, iterable=iterable, body=body)
+def filter(iterable: m.Expr, value: str, body: m.Expr, concurrency: int | None = None):
+    return m.build(
+        m.Filter, value=value, iterable=iterable, body=body, concurrency=concurrency
+    )
+
+
+def map(iterable: m.Expr, value: str, body: m.Expr, concurrency: int | None = None):
+    return m.build(
+        m.Map, value=value, iterable=iterable, body=body, concurrency=concurrency
+    )
+
+
+def for_(iterable: m.Expr, value: str, body: m.Block, concurrency: int | None = 1):
+    return m.build(
+        m.For, value=value, iterable=iterable, body=body, concurrency=concurrency
+    )
+
+
+def virtual_list(
+    iterable: m.Expr,
+    value: str,
+    body: m.Expr,
+    row_height: int | None = None,
+    height: int = 400,
+    overscan: int = 5,
+    page: Callable[..., Any] | None = None,
+    page_size: int = 50,
+    **page_args: m.Expr,
+):
+    # like map, but only the visible rows are rendered. with page (a bound
+    # @pue.action taking offset and limit, returning a pue.Page) iterable is the
+    # first Page, and the rest is loaded on scroll, e.g.
+    # s.virtual_list(s.this.get("rows"), "row", h.div(...), page=self.rows)
+    return m.build(
+        m.VirtualList,
+        value=value,
+        iterable=iterable,
+        body=body,
+        row_height=row_height,
+        height=height,
+        overscan=overscan,
+        page=action(page, **page_args) if page is not None else None,
+        page_size=page_size,
+    )
 
 
 def try_(
     try_clause: m.Block, catch: m.Block | None = None, finally_: m.Block | None = None
 ):
-    return m.Try(try_clause=try_clause, catch_clause=catch, finally_clause=finally_)
+    return m.build(
+        m.Try, try_clause=try_clause, catch_clause=catch, finally_clause=finally_
+    )
 
 
 def panic(msg: str):
-    return m.Panic(msg=msg)
+    return m.build(m.Panic, msg=msg)
 
 
 def fetch(
-    url: str, method: m.HTTPMethod = "get", headers: Dict[str, str] | None = None
+    url: str,
+    method: m.HTTPMethod = "get",
+    headers: Dict[str, str] | None = None,
+    ttl: float | None = None,
+    stale_while_revalidate: float | None = None,
+    dedupe_key: str | None = None,
 ):
-    return m.Fetch(url=url, method=method, headers=headers)
+    return m.build(
+        m.Fetch,
+        url=url,
+        method=method,
+        headers=headers,
+        ttl=ttl,
+        stale_while_revalidate=stale_while_revalidate,
+        dedupe_key=dedupe_key,
+    )
+
+
+def action(method: Callable[..., Any], **args: m.Expr):
+    # calls a bound @pue.action method on the server, e.g. s.action(self.add, title=...)
+    owner = getattr(method, "__self__", None)
+    if owner is None or not getattr(method, "__pue_action__", False):
+        raise TypeError(f"{method!r} is not a bound @pue.action method")
+    component = owner if isinstance(owner, type) else owner.__class__
+    return m.build(
+        m.Action, component=component.name(), name=method.__name__, args=args
+    )
 
 
 def if_(
@@ -81,26 +149,26 @@ def if_(
     then: m.Block | None = None,
     else_: m.Block | None = None,
 ):
-    return m.If(condition=condition, then_clause=then, else_clause=else_)
+    return m.build(m.If, condition=condition, then_clause=then, else_clause=else_)
 
 
 def binop(op: m.BinOpType):
     def inner(left: m.Expr, right: m.Expr):
-        return m.BinOp(op=op, left=left, right=right)
+        return m.build(m.BinOp, op=op, left=left, right=right)
 
     return inner
 
 
 def unaryop(op: m.UnaryOpType):
     def inner(expr: m.Expr):
-        return m.UnaryOp(op=op, expr=expr)
+        return m.build(m.UnaryOp, op=op, expr=expr)
 
     return inner
 
 
 def comparison(op: m.CompareType):
     def inner(left: m.Expr, right: m.Expr):
-        return m.Compare(op=op, left=left, right=right)
+        return m.build(m.Compare, op=op, left=left, right=right)
 
     return inner
 
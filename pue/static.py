@@ -0,0 +1,109 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import importlib
+import json
+import os
+from typing import TYPE_CHECKING, Dict
+from fastapi import Request
+from .payload import ENCODINGS, MIN_COMPRESS_SIZE, SUFFIXES, Payload, StaticFile
+
+# static export of everything that doesn't depend on the request: the route config,
+# client.js, the index page and the payload and bundle of every component not
+# marked `Component.dynamic`, each with precompressed variants. files are laid out
+# under the same paths they are served from, so the directory can be put behind
+# a cdn/static file server as is, or served by pue itself with
+# `Pue(routes, static_dir=...)`, which falls back to live rendering for
+# dynamic components
+#
+#   python -m pue.static example:PUE dist
+
+if TYPE_CHECKING:
+    from .main import Pue
+
+MANIFEST = "manifest.json"
+
+
+async def export(pue: Pue, out_dir: str) -> Dict[str, Payload]:
+    # components are rendered against a bare request, anything that needs a
+    # real one should be marked dynamic
+    req = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [],
+            "query_string": b"",
+        }
+    )
+    config = pue.config_path.strip("/")
+    files: Dict[str, Payload] = {
+        "index.html": Payload(pue.index_html().encode(), media_type="text/html"),
+        f"{config}/routes": pue._routes_payload,
+        f"{config}/client.js": pue._client_js,
+        config + pue.client_js_path: pue._client_js,
+    }
+    bundles: Dict[str, str] = {}
+    components = [c for c in pue._components.values() if not c.dynamic]
+    rendered = await asyncio.gather(*[c.async_rendered(req) for c in components])
+    for component, r in zip(components, rendered):
+        path = f"{config}/{component.endpoint_path()}"
+        files[path] = r.payload
+        files[f"{config}/bundles/{r.bundle.hash}"] = r.bundle
+        bundles[path] = r.bundle.hash
+
+    manifest: Dict[str, Dict] = {}
+    for path, payload in files.items():
+        encodings = ENCODINGS if len(payload.body) >= MIN_COMPRESS_SIZE else ()
+        _write(os.path.join(out_dir, path), payload.body)
+        for encoding in encodings:
+            _write(
+                os.path.join(out_dir, path + SUFFIXES[encoding]),
+                payload.compressed(encoding),
+            )
+        manifest[path] = {
+            "etag": payload.etag,
+            "mediaType": payload.media_type,
+            "encodings": encodings,
+        }
+        if path in bundles:
+            manifest[path]["bundle"] = bundles[path]
+    _write(os.path.join(out_dir, config, MANIFEST), json.dumps(manifest).encode())
+    return files
+
+
+def load(pue: Pue, static_dir: str) -> Dict[str, StaticFile]:
+    # exported files by path relative to the config path, e.g. "routes"
+    config = pue.config_path.strip("/")
+    with open(os.path.join(static_dir, config, MANIFEST)) as f:
+        manifest = json.load(f)
+    return {
+        path.removeprefix(config + "/"): StaticFile(
+            os.path.join(static_dir, path),
+            etag=entry["etag"],
+            media_type=entry["mediaType"],
+            encodings=entry["encodings"],
+            bundle=entry.get("bundle"),
+        )
+        for path, entry in manifest.items()
+        if path.startswith(config + "/")
+    }
+
+
+def _write(path: str, body: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="export static pue payloads")
+    parser.add_argument("app", help="module:attribute of the Pue instance")
+    parser.add_argument("out_dir")
+    args = parser.parse_args()
+    module, attr = args.app.split(":")
+    files = asyncio.run(
+        export(getattr(importlib.import_module(module), attr), args.out_dir)
+    )
+    for path in files:
+        print(os.path.join(args.out_dir, path))
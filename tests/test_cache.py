@@ -0,0 +1,77 @@
+import asyncio
+from fastapi import Request
+import pue
+from pue import dom as h
+from pue.cache import RenderCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    cache = RenderCache()
+    assert cache.get("a") is None
+    cache.set("a", "rendered")  # type: ignore[arg-type]
+    assert cache.get("a") == "rendered"
+    assert cache.get("a") == "rendered"
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 1}
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = RenderCache(ttl=10, clock=clock)
+    cache.set("a", "rendered")  # type: ignore[arg-type]
+    clock.now = 10
+    assert cache.get("a") == "rendered"
+    clock.now = 10.5
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_no_ttl_never_expires():
+    clock = Clock()
+    cache = RenderCache(clock=clock)
+    cache.set("a", "rendered")  # type: ignore[arg-type]
+    clock.now = 1e12
+    assert cache.get("a") == "rendered"
+
+
+def test_lru_eviction_at_capacity():
+    cache = RenderCache(maxsize=2)
+    cache.set("a", "1")  # type: ignore[arg-type]
+    cache.set("b", "2")  # type: ignore[arg-type]
+    # a is now the most recently used, so b goes first
+    cache.get("a")
+    cache.set("c", "3")  # type: ignore[arg-type]
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_component_renders_once_per_key():
+    renders = []
+
+    class Cached(pue.Component):
+        render_cache = RenderCache(ttl=60)
+
+        async def async_template(self, req):
+            renders.append(req)
+            return h.div("cached")
+
+    def request() -> Request:
+        return Request({"type": "http", "method": "GET", "headers": [], "state": {}})
+
+    first = asyncio.run(Cached.async_rendered(request()))
+    second = asyncio.run(Cached.async_rendered(request()))
+    assert first is second
+    assert len(renders) == 1
+    assert Cached.render_cache.stats() == {"hits": 1, "misses": 1, "size": 1}
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from typing import Any
+import pytest
+import example
+from pue import dom as h, models as m, script as s
+from pue.compact import REF, encode_compact
+from pue.encoder import encode
+
+
+def _expand(payload: Any) -> Any:
+    # same as expandBundle in client.js, entries can reference other entries
+    payload = dict(payload)
+    table = payload.pop(REF, None)
+    if table is None:
+        return payload
+
+    def expand(value: Any) -> Any:
+        if isinstance(value, list):
+            return [expand(item) for item in value]
+        if isinstance(value, dict):
+            if REF in value:
+                return expand(table[value[REF]])
+            return {key: expand(item) for key, item in value.items()}
+        return value
+
+    return expand(payload)
+
+
+def _bundle(res: m.ComponentEndpointResponse) -> m.ComponentBundle:
+    # as RenderedComponent.from_response builds it
+    fields = {name: getattr(res, name) for name in m.ComponentBundle.model_fields}
+    return m.ComponentBundle.model_construct(**fields)
+
+
+def _round_trip(bundle: m.ComponentBundle) -> Any:
+    compact = json.loads(encode_compact(bundle))
+    assert _expand(compact) == json.loads(encode(bundle))
+    return compact
+
+
+def _card(i: int) -> m.VNode:
+    title = h.h2("card", class_="text-sm font-medium text-gray-900 truncate")
+    label = h.span("footer", class_="text-xs text-gray-500")
+    return h.div(
+        title,
+        h.p(f"body {i}", class_="text-sm font-medium text-gray-900 truncate"),
+        h.div(label, class_="mt-2"),
+        label,
+        key=i,
+    )
+
+
+@pytest.mark.parametrize(
+    "component", [example.App, example.Todos, example.FetchExample]
+)
+def test_example_components_round_trip(component):
+    res = asyncio.run(component.async_endpoint(None))  # type: ignore[arg-type]
+    _round_trip(_bundle(res))
+
+
+def test_repeated_subtrees_round_trip():
+    template = h.div(*[_card(i) for i in range(20)], class_="grid gap-4")
+    compact = _round_trip(_bundle(m.ComponentEndpointResponse(template=template)))
+    # tabled subtrees refer to other entries: the title to its class string,
+    # the footer to the label it shares with the card
+    table = compact[REF]
+    refs = [
+        table[child[REF]]
+        for entry in table
+        if isinstance(entry, dict)
+        for child in entry.get("children", [])
+        if isinstance(child, dict) and REF in child
+    ]
+    assert any(isinstance(ref, dict) for ref in refs)
+    assert any(
+        isinstance(entry, dict) and REF in entry["props"].get("class", {})
+        for entry in table
+    )
+
+
+def test_user_ref_key_is_sent_plain():
+    template = h.div(*[_card(i) for i in range(20)], data_x=s.obj({REF: 1}))
+    bundle = _bundle(m.ComponentEndpointResponse(template=template))
+    assert encode_compact(bundle) == encode(bundle)
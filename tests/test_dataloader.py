@@ -0,0 +1,156 @@
+import asyncio
+from typing import Dict, List
+import pytest
+from fastapi import Request
+from pue.dataloader import DataLoader, bind, loader
+
+
+class Batches:
+    def __init__(self):
+        self.calls: List[List[int]] = []
+
+    async def __call__(self, keys: List[int]) -> List[int]:
+        self.calls.append(keys)
+        return [key * 10 for key in keys]
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "headers": []})
+
+
+def test_loads_in_the_same_tick_are_one_batch():
+    batch = Batches()
+
+    async def run():
+        dl = DataLoader(batch)
+        return await asyncio.gather(dl.load(1), dl.load(2), dl.load_many([3, 4]))
+
+    assert asyncio.run(run()) == [10, 20, [30, 40]]
+    assert batch.calls == [[1, 2, 3, 4]]
+
+
+def test_keys_are_deduplicated_and_cached():
+    batch = Batches()
+
+    async def run():
+        dl = DataLoader(batch)
+        values = await asyncio.gather(dl.load(1), dl.load(1), dl.load(2))
+        assert await dl.load(1) == 10
+        return values, dl.stats()
+
+    values, stats = asyncio.run(run())
+    assert values == [10, 10, 20]
+    assert batch.calls == [[1, 2]]
+    assert stats == {"loads": 4, "keys": 2, "batches": 1, "deduplicated": 2}
+
+
+def test_max_batch_size():
+    batch = Batches()
+
+    async def run():
+        return await DataLoader(batch, max_batch_size=2).load_many([1, 2, 3, 4, 5])
+
+    assert asyncio.run(run()) == [10, 20, 30, 40, 50]
+    assert batch.calls == [[1, 2], [3, 4], [5]]
+
+
+def test_mapping_results():
+    async def by_key(keys: List[int]) -> Dict[int, str]:
+        return {1: "one"}
+
+    async def run():
+        return await DataLoader(by_key).load_many([1, 2])
+
+    assert asyncio.run(run()) == ["one", None]
+
+
+def test_batch_error_reaches_every_key_and_is_retried():
+    error = RuntimeError("db down")
+    calls = []
+
+    async def flaky(keys: List[int]) -> List[int]:
+        calls.append(keys)
+        if len(calls) == 1:
+            raise error
+        return keys
+
+    async def run():
+        dl = DataLoader(flaky)
+        results = await asyncio.gather(
+            dl.load(1), dl.load(1), dl.load(2), return_exceptions=True
+        )
+        return results, await dl.load(1)
+
+    results, retried = asyncio.run(run())
+    # the same exception object for every waiting load
+    assert all(result is error for result in results)
+    assert retried == 1
+    assert calls == [[1, 2], [1]]
+
+
+def test_exception_values_fail_only_their_key():
+    async def partial(keys: List[int]) -> List[object]:
+        return [KeyError(key) if key == 2 else key for key in keys]
+
+    async def run():
+        dl = DataLoader(partial)
+        return await asyncio.gather(dl.load(1), dl.load(2), return_exceptions=True)
+
+    ok, failed = asyncio.run(run())
+    assert ok == 1
+    assert isinstance(failed, KeyError)
+
+
+def test_wrong_number_of_values():
+    async def short(keys: List[int]) -> List[int]:
+        return keys[:1]
+
+    async def run():
+        return await DataLoader(short).load_many([1, 2])
+
+    with pytest.raises(ValueError, match="returned 1 values for 2 keys"):
+        asyncio.run(run())
+
+
+def test_cancelled_load_doesnt_cancel_other_callers():
+    async def slow(keys: List[int]) -> List[int]:
+        await asyncio.sleep(0.01)
+        return keys
+
+    async def run():
+        dl = DataLoader(slow)
+        first = asyncio.ensure_future(dl.load(1))
+        second = asyncio.ensure_future(dl.load(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 1
+
+
+def test_loaders_are_scoped_per_request():
+    batch = Batches()
+    req, other = _request(), _request()
+
+    async def load(key: int) -> int:
+        return await loader(batch).load(key)
+
+    async def run():
+        with bind(req):
+            # tasks started inside inherit the request scope
+            assert await asyncio.gather(load(1), load(2)) == [10, 20]
+        with bind(req):
+            assert await load(1) == 10
+            same = loader(batch)
+        with bind(other):
+            assert await load(1) == 10
+            assert loader(batch) is not same
+
+    asyncio.run(run())
+    # the second bind(req) hit the first one's cache
+    assert batch.calls == [[1, 2], [1]]
+
+
+def test_loader_outside_a_request():
+    with pytest.raises(RuntimeError):
+        loader(Batches())
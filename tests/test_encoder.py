@@ -0,0 +1,71 @@
+import asyncio
+import json
+import math
+from typing import Any, Dict
+import pytest
+from pydantic import BaseModel
+import example
+from pue import dom as h, models as m, script as s
+from pue.encoder import encode
+
+
+class Data(BaseModel):
+    d: Dict[Any, Any]
+
+
+@pytest.mark.parametrize(
+    "component", [example.App, example.Todos, example.FetchExample]
+)
+def test_matches_pydantic_for_example_components(component):
+    res = asyncio.run(component.async_endpoint(None))  # type: ignore[arg-type]
+    assert encode(res) == res.model_dump_json(by_alias=True).encode()
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {1: "int"},
+        {1.5: "float", 2.0: "whole float"},
+        {True: "bool", False: "bool"},
+        {"nested": {3: [{4: None}]}},
+        {("onClick", "prevent"): "modifiers"},
+    ],
+)
+def test_non_str_dict_keys_match_pydantic(value):
+    model = Data(d=value)
+    assert encode(model) == model.model_dump_json().encode()
+
+
+def test_non_str_keys_in_component_data():
+    res = m.ComponentEndpointResponse(
+        template=h.div("x"),
+        data={"by_id": {1: "a", 2: "b"}, "flags": {True: 1}},
+    )
+    assert encode(res) == res.model_dump_json(by_alias=True).encode()
+
+
+# pydantic warns about the unvalidated union members, it still serializes them
+@pytest.mark.filterwarnings("ignore:Pydantic serializer warnings")
+def test_non_str_keys_in_unvalidated_dictionary():
+    # "construct" mode doesn't coerce Dictionary keys to str
+    m.set_builder_mode("construct")
+    try:
+        res = m.ComponentEndpointResponse(template=h.div(s.obj({1: "a", 2.5: "b"})))
+    finally:
+        m.set_builder_mode("validate")
+    assert encode(res) == res.model_dump_json(by_alias=True).encode()
+
+
+@pytest.mark.parametrize(
+    "value", [math.inf, -math.inf, math.nan, 1e20, 1e16, 1e-5, 1e-7, 0.1, -0.0, 2.0]
+)
+def test_floats_match_pydantic(value):
+    res = m.ComponentEndpointResponse(
+        template=h.div(s.add(value, 1)), data={"value": value, "list": [value]}
+    )
+    body = encode(res)
+    assert body == res.model_dump_json(by_alias=True).encode()
+    # valid json, Infinity/NaN become null
+    assert json.loads(body, parse_constant=pytest.fail)["data"]["list"] == [
+        value if math.isfinite(value) else None
+    ]
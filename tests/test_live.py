@@ -0,0 +1,179 @@
+import asyncio
+import json
+from typing import Any, List
+import pytest
+from fastapi.testclient import TestClient
+import pue
+from pue import dom as h, models as m
+from pue.encoder import encode
+from pue.live import Connection, Patch, diff
+from pue.optimizer import hoist, optimize
+from pue.script import this
+
+
+def _apply(root: Any, patch: Patch) -> Any:
+    # same as applyPatch in client.js
+    for op in patch:
+        *parents, key = op["path"]
+        parent = root
+        for part in parents:
+            parent = parent[part]
+        value = json.loads(encode(op.get("value")))
+        if op["op"] == "replace":
+            parent[key] = value
+        elif isinstance(parent, list):
+            if op["op"] == "add":
+                parent.insert(key, value)
+            else:
+                del parent[key]
+        elif op["op"] == "add":
+            parent[key] = value
+        else:
+            del parent[key]
+    return root
+
+
+def _check(old: Any, new: Any) -> Patch:
+    patch: Patch = []
+    diff(old, new, ["data"], patch)
+    root = {"data": json.loads(encode(old))}
+    assert _apply(root, patch)["data"] == json.loads(encode(new))
+    return patch
+
+
+ITEMS = [{"id": i, "title": f"item {i}"} for i in range(6)]
+
+
+@pytest.mark.parametrize(
+    "new",
+    [
+        [{"id": -1}, *ITEMS],
+        [{"id": -2}, {"id": -1}, *ITEMS],
+        [*ITEMS[:3], {"id": -1}, *ITEMS[3:]],
+        [*ITEMS[:3], {"id": -1}, {"id": -2}, *ITEMS[3:]],
+        [*ITEMS, {"id": -1}],
+        ITEMS[1:],
+        ITEMS[2:],
+        [*ITEMS[:2], *ITEMS[4:]],
+        ITEMS[:-1],
+        ITEMS[:-3],
+        [],
+        [{"id": -1}, *ITEMS[1:4], {"id": -2}, {"id": -3}],
+        [*ITEMS[:2], {**ITEMS[2], "title": "changed"}, *ITEMS[3:]],
+    ],
+)
+def test_list_diff_applies(new):
+    _check(ITEMS, new)
+
+
+def test_list_insert_is_one_op():
+    assert len(_check(ITEMS, [*ITEMS[:3], {"id": -1}, *ITEMS[3:]])) == 1
+    assert len(_check(ITEMS, [*ITEMS[:3], *ITEMS[4:]])) == 1
+
+
+def test_dict_and_type_changes_apply():
+    _check({"a": 1, "b": [1, 2], "c": None}, {"a": True, "b": {"x": 1}, "d": "new"})
+    _check([1, 2, 3], [True, 2, 3])
+
+
+def test_template_diff_applies():
+    def template(rows: List[str]) -> m.VNode:
+        return h.div(h.ul(*[h.li(row, key=row) for row in rows]), class_="p-4")
+
+    _check(template(["a", "b", "c"]), template(["z", "a", "c", "d"]))
+
+
+def test_poll_survives_a_failing_update():
+    class Component:
+        live_interval = 0.001
+
+        @staticmethod
+        def name():
+            return "Component"
+
+    async def run():
+        conn = Connection(None, {})  # type: ignore[arg-type]
+        calls = []
+
+        async def update(component):
+            calls.append(component)
+            if len(calls) == 1:
+                raise ValueError("render failed")
+
+        conn.update = update  # type: ignore[method-assign]
+        task = asyncio.create_task(conn.poll(Component))  # type: ignore[arg-type]
+
+        async def polled():
+            while len(calls) < 3:
+                await asyncio.sleep(0.001)
+
+        try:
+            await asyncio.wait_for(polled(), 1)
+        finally:
+            task.cancel()
+
+    asyncio.run(run())
+
+
+class Clock(pue.Component):
+    live = True
+
+    async def async_data(self):
+        return {"now": 1}
+
+    async def async_template(self, req):
+        return h.p(this.get("now"))
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        "not json",
+        "[1, 2]",
+        '"subscribe"',
+        '{"subscribe": ["Clock"]}',
+        '{"subscribe": {"a": 1}}',
+        '{"subscribe": "Clock", "bundle": 1}',
+        '{"subscribe": "Missing"}',
+        '{"unsubscribe": "Missing"}',
+        "{}",
+    ],
+)
+def test_bad_messages_dont_drop_the_connection(frame):
+    app = pue.Pue(routes=[pue.Route(path="/", component=Clock)])
+    with TestClient(app.config_api).websocket_connect("/live") as ws:
+        ws.send_text(frame)
+        ws.send_json({"subscribe": Clock.name()})
+        message = ws.receive_json()
+    assert message["component"] == Clock.name()
+    assert message["patch"][-1] == {
+        "op": "replace",
+        "path": ["data"],
+        "value": {"now": 1},
+    }
+
+
+def _hoisted(template: m.VNode) -> m.VNode:
+    return hoist(optimize(template))
+
+
+def test_static_to_dynamic_removes_the_static_slot():
+    old = _hoisted(h.div(h.p("hello", class_="x"), h.p(this.get("count"))))
+    new = _hoisted(h.div(h.p(this.get("greeting"), class_="x"), h.p(this.get("count"))))
+    assert old.children[0].static is not None
+    assert new.children[0].static is None
+    patch = _check(old, new)
+    assert {"op": "remove", "path": ["data", "children", 0, "static"]} in patch
+    # never a null the client could mistake for a slot
+    assert all(op.get("value", 0) is not None for op in patch)
+
+
+def test_dynamic_to_static_adds_the_static_slot():
+    old = _hoisted(h.div(h.p(this.get("greeting")), h.p(this.get("count"))))
+    new = _hoisted(h.div(h.p("hello"), h.p(this.get("count"))))
+    patch = _check(old, new)
+    assert {
+        "op": "add",
+        "path": ["data", "children", 0, "static"],
+        "value": new.children[0].static,
+    } in patch
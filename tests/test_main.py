@@ -0,0 +1,31 @@
+import asyncio
+import json
+import pue
+from pue import dom as h, models as m
+
+
+class Actions(pue.Component):
+    async def async_template(self, req):
+        return h.div()
+
+    @pue.action
+    async def ok(self) -> int:
+        return 1
+
+    @pue.action
+    async def unencodable(self) -> object:
+        return object()
+
+
+def _call(action: str):
+    app = pue.Pue(routes=[pue.Route(path="/", component=Actions)])
+    call = m.ActionCall(component=Actions.name(), action=action)
+    return json.loads(asyncio.run(app._async_call(None, call)))  # type: ignore[arg-type]
+
+
+def test_action_result():
+    assert _call("ok") == {"value": 1}
+
+
+def test_unencodable_action_result_is_a_500():
+    assert _call("unencodable") == {"error": "internal server error", "status": 500}
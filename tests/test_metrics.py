@@ -0,0 +1,98 @@
+import re
+from typing import List, Tuple
+from fastapi.testclient import TestClient
+import example
+import pue
+from pue import dom as h
+from pue.metrics import Labels
+from pue.script import this
+
+
+async def load_names(ids: List[int]) -> List[str]:
+    return [f"user {i}" for i in ids]
+
+
+class Users(pue.Component):
+    async def async_data(self):
+        loader = pue.loader(load_names)
+        return {"names": [await loader.load(1), await loader.load(1)]}
+
+    async def async_template(self, req):
+        return h.p(this.get("names"))
+
+
+def _app():
+    observed: List[Tuple[str, float, Labels]] = []
+    routes = [*example.PUE._routes, pue.Route(path="/users", component=Users)]
+    app = pue.Pue(routes=routes, metrics=lambda *o: observed.append(o))
+    return TestClient(app.config_api), observed
+
+
+def test_server_timing_header():
+    client, _ = _app()
+    res = client.get("/" + example.Todos.endpoint_path())
+    timings = dict(
+        re.fullmatch(r"([\w.]+);dur=([\d.]+)", part).groups()  # type: ignore[union-attr]
+        for part in res.headers["server-timing"].split(", ")
+    )
+    for name in ("template", "data", "computed", "serialize"):
+        assert f"Todos.{name}" in timings
+    assert float(timings["total"]) >= float(timings["Todos.template"])
+
+
+def test_loader_header():
+    client, _ = _app()
+    res = client.get("/" + Users.endpoint_path())
+    assert res.headers["x-pue-loaders"] == (
+        "load_names;loads=2;keys=1;batches=1;deduplicated=1"
+    )
+
+
+def test_metrics_are_recorded_per_route():
+    client, observed = _app()
+    client.get("/" + example.Todos.endpoint_path())
+    client.get("/" + example.FetchExample.endpoint_path())
+    routes = [
+        labels["route"] for name, _, labels in observed if name == "pue_request_seconds"
+    ]
+    assert routes == [
+        "/" + example.Todos.endpoint_path(),
+        "/" + example.FetchExample.endpoint_path(),
+    ]
+    hooks = {
+        (labels["component"], labels["hook"])
+        for name, _, labels in observed
+        if name == "pue_hook_seconds"
+    }
+    assert ("Todos", "data") in hooks
+    assert ("FetchExample", "template") in hooks
+
+
+def test_stats_endpoint_reflects_requests():
+    client, observed = _app()
+    path = "/" + example.Todos.endpoint_path()
+    client.get(path)
+    client.get(path)
+    stats = client.get("/stats").json()
+    (requests,) = [
+        series
+        for series in stats["pue_request_seconds"]
+        if series["labels"] == {"route": path}
+    ]
+    assert requests["count"] == 2
+    assert 0 < requests["max"] <= requests["sum"]
+    payloads = {
+        series["labels"]["part"]: series
+        for series in stats["pue_payload_bytes"]
+        if series["labels"]["component"] == "Todos"
+    }
+    assert set(payloads) == {"bundle", "data"}
+    assert payloads["bundle"]["count"] == 2
+    # the same values went to the callback
+    bundle_sizes = [
+        value
+        for name, value, labels in observed
+        if name == "pue_payload_bytes"
+        and labels == {"component": "Todos", "part": "bundle"}
+    ]
+    assert payloads["bundle"]["sum"] == sum(bundle_sizes)
@@ -0,0 +1,102 @@
+import pytest
+from pue import dom as h, models as m, script as s
+from pue.optimizer import optimize, optimize_response
+from pue.render import ComponentState, Scope, render, render_response
+from pue.script import local, this
+
+DATA = {"count": 3, "ratio": 1.0, "user": {"name": "ada", "tags": ["a", "b"]}}
+
+
+def _bool(op: str, left, right) -> m.BoolOp:
+    return m.build(m.BoolOp, op=op, left=left, right=right)
+
+
+def _render(template) -> str:
+    return "".join(render(template, Scope(ComponentState(DATA, None))))
+
+
+FOLDED = [
+    s.add(1, 2),
+    s.add("a", "b"),
+    s.sub(1, 2.5),
+    s.mul(3, 0.5),
+    s.div(7, 2),
+    s.div(1, 3),
+    s.eq(1, 1.0),
+    s.eq(1, True),
+    s.neq(1, "1"),
+    s.eq(None, None),
+    s.lt(1, 2.5),
+    s.gte(2, 2),
+    s.in_("b", "abc"),
+    s.not_(0),
+    s.not_(""),
+    s.not_("x"),
+    s.usub(2),
+    _bool("and", 1, "x"),
+    _bool("and", 0, "x"),
+    _bool("or", "", 0),
+    _bool("or", 0.0, "y"),
+    s.if_(s.gt(2, 1), then="yes", else_="no"),
+    s.if_(s.eq(1, 1.0), then="same", else_="different"),
+]
+
+NOT_FOLDED = [
+    s.mod(-7, 3),
+    s.floordiv(7, 2),
+    s.div(1, 0),
+    s.add(2**53, 1),
+    s.add(1, "a"),
+]
+
+
+@pytest.mark.parametrize("expr", FOLDED)
+def test_folds_to_a_constant(expr):
+    folded = optimize(expr)
+    assert not isinstance(folded, m.AST)
+    assert _render(h.p(folded)) == _render(h.p(expr))
+
+
+@pytest.mark.parametrize("expr", NOT_FOLDED)
+def test_leaves_what_js_does_differently(expr):
+    assert optimize(expr) == expr
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        h.div(
+            h.p(s.add(this.get("count"), s.mul(2, 3))),
+            h.p(s.if_(s.eq(this.get("count"), 3.0), then="three", else_="not")),
+            h.p(s.if_(s.lt(1, 0), then="never", else_=this.get("user.name"))),
+            h.p(this.get("user.tags.length")),
+            h.p(s.eq(this.get("ratio"), 1)),
+            class_="p-4",
+        ),
+        h.ul(
+            s.map(
+                this.get("user.tags"),
+                "tag",
+                h.li(s.add(local.get("tag"), s.add("-", "x")), class_="tag"),
+            ),
+            s.filter(this.get("user.tags"), "tag", s.neq(local.get("tag"), "a")),
+        ),
+    ],
+)
+def test_optimized_template_renders_the_same(template):
+    res = m.ComponentEndpointResponse(template=template, data=DATA)
+    optimized = optimize_response(res)
+    assert optimized.template != template
+    assert "".join(render_response(optimized)) == "".join(render_response(res))
+
+
+def test_dotted_names_are_pre_split():
+    assert optimize(this.get("user.name")).name == ["user", "name"]
+    assert optimize(local.get("tag.length")).name == ["tag", "length"]
+    load = this.get("count")
+    assert optimize(load) is load
+
+
+def test_unchanged_nodes_are_not_copied():
+    template = h.div(h.p(this.get("count")), on_click=s.log("x"))
+    assert optimize(template) is template
@@ -0,0 +1,83 @@
+import gzip
+import pytest
+from fastapi import Request
+from pue.payload import Payload, StaticFile, _negotiate
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.0, gzip", "gzip"),
+        ("br; q=0.000, gzip;q=0.5", "gzip"),
+        ("BR;Q=0, gzip", "gzip"),
+        ("br;q=0.001", "br"),
+        ("br;q=oops, gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    assert _negotiate(accept_encoding, ("br", "gzip")) == expected
+
+
+def _request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [
+                (k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()
+            ],
+        }
+    )
+
+
+BODY = Payload(b"x" * 1000)
+
+
+def test_etag_is_per_encoding():
+    identity = BODY.response(_request())
+    gzipped = BODY.response(_request(accept_encoding="gzip"))
+    assert identity.headers["etag"] == BODY.etag
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == BODY.etag[:-1] + '-gz"'
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+
+
+def test_small_bodies_are_sent_as_is_with_the_plain_etag():
+    small = Payload(b"{}")
+    res = small.response(_request(accept_encoding="gzip"))
+    assert "content-encoding" not in res.headers
+    assert res.headers["etag"] == small.etag
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [BODY.etag, BODY.etag[:-1] + '-gz"', f'W/{BODY.etag[:-1]}-br", "other"', "*"],
+)
+def test_any_variant_tag_revalidates(if_none_match):
+    res = BODY.response(_request(accept_encoding="gzip", if_none_match=if_none_match))
+    assert res.status_code == 304
+    # with the tag of the variant that would have been sent
+    assert res.headers["etag"] == BODY.etag[:-1] + '-gz"'
+
+
+@pytest.mark.parametrize("if_none_match", ['"other"', BODY.etag[:-1] + 'x-gz"'])
+def test_other_tags_dont_revalidate(if_none_match):
+    res = BODY.response(_request(if_none_match=if_none_match))
+    assert res.status_code == 200
+
+
+def test_static_file_etag_is_per_encoding(tmp_path):
+    path = tmp_path / "payload.json"
+    path.write_bytes(b"x" * 1000)
+    (tmp_path / "payload.json.gz").write_bytes(gzip.compress(b"x" * 1000))
+    file = StaticFile(str(path), '"abc"', encodings=["gzip"])
+    assert file.response(_request()).headers["etag"] == '"abc"'
+    gzipped = file.response(_request(accept_encoding="gzip"))
+    assert gzipped.headers["etag"] == '"abc-gz"'
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert file.response(_request(if_none_match='"abc-gz"')).status_code == 304
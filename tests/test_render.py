@@ -0,0 +1,106 @@
+import math
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+import pue
+from pue import dom as h, script as s
+from pue.render import RenderError, Scope, _binop, _compare, evaluate, render
+from pue.script import this
+
+
+class Divide(pue.Component):
+    async def async_data(self):
+        return {"a": 1, "b": 0, "items": None}
+
+    async def async_template(self, req: Request):
+        return h.div(
+            h.p(s.div(this.get("a"), this.get("b"))), h.p(this.get("items.length"))
+        )
+
+
+class Broken(pue.Component):
+    async def async_template(self, req: Request):
+        raise ValueError("endpoint failed")
+
+
+@pytest.mark.parametrize(
+    "op, left, right, expected",
+    [
+        ("div", 1, 0, math.inf),
+        ("div", -1, 0, -math.inf),
+        ("div", 1, -0.0, -math.inf),
+        ("div", 0, 0, math.nan),
+        ("div", 7, 2, 3.5),
+        ("mod", 1, 0, math.nan),
+        ("mod", -7, 3, -1),
+        ("mod", 7, -3, 1),
+        ("mod", 7, 3, 1),
+        ("floordiv", 1, 0, math.inf),
+        ("floordiv", 7, 2, 3),
+    ],
+)
+def test_binop_matches_js(op, left, right, expected):
+    value = _binop(op, left, right)
+    if math.isnan(expected):
+        assert math.isnan(value)
+    else:
+        assert value == expected
+
+
+@pytest.mark.parametrize(
+    "left, right, expected",
+    [
+        (1, 1.0, True),
+        (2.0, 2, True),
+        (0, -0.0, True),
+        (1, 2.0, False),
+        (1, True, False),
+        (0, False, False),
+        (1, "1", False),
+        (None, None, True),
+        (math.nan, math.nan, False),
+    ],
+)
+def test_compare_eq_is_js_strict_equality(left, right, expected):
+    assert _compare("eq", left, right) is expected
+    assert _compare("neq", left, right) is not expected
+
+
+def test_int_float_compare_from_data():
+    scope = Scope({"count": 1, "limit": 1.0})
+    template = s.if_(s.eq(this.get("count"), this.get("limit")), then="y", else_="n")
+    assert evaluate(template, scope) == "y"
+
+
+def test_scope_locals_are_not_shared():
+    scope = Scope({})
+    scope.locals["x"] = 1
+    assert Scope({}).locals == {}
+
+
+def test_nan_is_falsy():
+    template = s.if_(s.div(0, 0), then="yes", else_="no")
+    assert evaluate(template, Scope({})) == "no"
+
+
+def _client(component):
+    app = pue.Pue(routes=[pue.Route(path="/", component=component)], ssr=True)
+    return TestClient(app.index_api, raise_server_exceptions=False)
+
+
+def test_stream_finishes_the_page_when_render_fails():
+    res = _client(Divide).get("/")
+    assert res.status_code == 200
+    assert "<p>Infinity</p>" in res.text
+    assert 'id="pue-state"' in res.text
+    assert res.text.rstrip().endswith("</html>")
+
+
+def test_render_wraps_unexpected_errors():
+    scope = Scope({"items": None})
+    with pytest.raises(RenderError):
+        "".join(render(h.ul(s.map(this.get("items"), "item", h.li())), scope))
+
+
+def test_endpoint_error_is_an_error_response():
+    assert _client(Broken).get("/").status_code == 500
@@ -0,0 +1,73 @@
+from typing import List
+import pytest
+from pue import models as m
+from pue.router import resolve
+
+ROUTES = [
+    m.Route(
+        path="/",
+        name="root",
+        children=[
+            m.Route(path="", name="index", redirect="todos"),
+            m.Route(path="todos", name="todos"),
+            m.Route(path="users/:id", name="user"),
+            m.Route(path="users/new", name="new-user"),
+            m.Route(path="/absolute", name="absolute"),
+        ],
+    ),
+    m.Route(path="/:pathMatch(.*)*", name="not-found"),
+]
+
+
+def _names(path: str, routes: List[m.Route] = ROUTES) -> List[str | None]:
+    return [route.name for route in resolve(routes, path)]
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/todos", ["root", "todos"]),
+        ("/users/1", ["root", "user"]),
+        ("/absolute", ["root", "absolute"]),
+        ("/todos?filter=done", ["root", "todos"]),
+    ],
+)
+def test_nested_routes(path, expected):
+    assert _names(path) == expected
+
+
+def test_static_segment_beats_param_declared_first():
+    assert _names("/users/new") == ["root", "new-user"]
+
+
+def test_redirect():
+    assert _names("/") == ["root", "todos"]
+
+
+@pytest.mark.parametrize("path", ["/todos/", "//todos", "/users/1/"])
+def test_trailing_and_repeated_slashes(path):
+    assert _names(path)[-1] in ("todos", "user")
+
+
+@pytest.mark.parametrize("path", ["/missing", "/users", "/todos/1", "/a/b/c"])
+def test_catch_all(path):
+    assert _names(path) == ["not-found"]
+
+
+def test_catch_all_loses_to_any_other_match():
+    routes = [m.Route(path="/:pathMatch(.*)*", name="all"), *ROUTES[:1]]
+    assert _names("/todos", routes) == ["root", "todos"]
+    assert _names("/", routes) == ["root", "todos"]
+
+
+def test_no_match():
+    assert _names("/missing", ROUTES[:1]) == []
+    assert _names("/users", ROUTES[:1]) == []
+
+
+def test_redirect_loop_gives_up():
+    routes = [
+        m.Route(path="/a", redirect="/b"),
+        m.Route(path="/b", redirect="/a"),
+    ]
+    assert resolve(routes, "/a") == []
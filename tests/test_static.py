@@ -0,0 +1,71 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import pytest
+from fastapi.testclient import TestClient
+import example
+import pue
+from pue.static import MANIFEST, export
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    out = tmp_path_factory.mktemp("dist")
+    files = asyncio.run(export(example.PUE, str(out)))
+    return out, files
+
+
+def test_writes_every_payload(exported):
+    out, files = exported
+    config = example.PUE.config_path.strip("/")
+    assert "index.html" in files
+    assert f"{config}/routes" in files
+    for cls in (example.App, example.Todos, example.FetchExample):
+        assert f"{config}/{cls.endpoint_path()}" in files
+    for path, payload in files.items():
+        assert (out / path).read_bytes() == payload.body
+
+
+def test_manifest_digests(exported):
+    out, files = exported
+    config = example.PUE.config_path.strip("/")
+    manifest = json.loads((out / config / MANIFEST).read_text())
+    assert set(manifest) == set(files)
+    for path, entry in manifest.items():
+        body = (out / path).read_bytes()
+        assert entry["etag"] == f'"{hashlib.sha256(body).hexdigest()[:20]}"'
+        assert entry["mediaType"] == files[path].media_type
+        for encoding in entry["encodings"]:
+            assert encoding in ("gzip", "br")
+        if "gzip" in entry["encodings"]:
+            assert gzip.decompress((out / f"{path}.gz").read_bytes()) == body
+        if "bundle" in entry:
+            # bundles are content addressed, and referenced by their payload
+            bundle = (out / config / "bundles" / entry["bundle"]).read_bytes()
+            assert hashlib.sha256(bundle).hexdigest()[:20] == entry["bundle"]
+
+
+def test_serves_exported_files(exported):
+    out, files = exported
+    app = pue.Pue(routes=example.PUE._routes, static_dir=str(out))
+    client = TestClient(app.config_api)
+    config = example.PUE.config_path.strip("/")
+    # big enough to be precompressed
+    path = example.App.endpoint_path()
+    etag = files[f"{config}/{path}"].etag
+
+    res = client.get(f"/{path}", headers={"accept-encoding": "identity"})
+    assert res.status_code == 200
+    assert res.headers["etag"] == etag
+    assert res.headers["cache-control"] == "no-cache"
+    assert res.headers["vary"] == "Accept-Encoding"
+    assert res.content == (out / config / path).read_bytes()
+
+    res = client.get(f"/{path}", headers={"accept-encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["etag"] == etag[:-1] + '-gz"'
+    assert res.content == (out / config / path).read_bytes()
+
+    res = client.get(f"/{path}", headers={"if-none-match": etag})
+    assert res.status_code == 304